@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data.term_sampler import TERM_DIFFICULTY_MODE, AliasTable, difficulty_table
+from game_logic import GRID_SIZE
+
+logger = logging.getLogger(__name__)
+
+# オフラインで生成した単語セットカタログのパス（scripts/build_term_catalog.py の出力）
+TERM_CATALOG_PATH = os.environ.get(
+    "TERM_CATALOG_PATH", os.path.join(os.path.dirname(__file__), "term_catalog.json"))
+# カタログのファイル形式のバージョン
+CATALOG_FORMAT_VERSION = 1
+# 生成時と辞書が異なるカタログを使うのに必要な被覆率（盤面に収まる用語のうち、いずれかのセットに含まれる割合）
+# これを下回る場合はカタログを使わず、実行時の抽選にフォールバックする
+TERM_CATALOG_MIN_COVERAGE = float(os.environ.get("TERM_CATALOG_MIN_COVERAGE", "0.5"))
+# 除外語と重ならないセットを探すときに試す回数（見つからなければ呼び出し側でフォールバック）
+CATALOG_SAMPLE_ATTEMPTS = 32
+
+_file_cache: Tuple[Optional[float], Optional[str], List[Dict[str, Any]]] = (None, None, [])
+_file_lock = threading.Lock()
+
+
+def load_catalog(path: str = TERM_CATALOG_PATH) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """
+    カタログファイルを読み込む（更新時刻が変わらない限り再読み込みしない）
+
+    Returns:
+        (生成時の用語索引のdigest, エントリ)。ファイルがない・壊れている場合は (None, [])
+    """
+    global _file_cache
+
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None, []
+
+    with _file_lock:
+        if _file_cache[0] == mtime:
+            return _file_cache[1], _file_cache[2]
+        digest = None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") != CATALOG_FORMAT_VERSION:
+                logger.warning(f"単語セットカタログの形式が異なるため使用しません: {path}")
+                entries = []
+            else:
+                digest = data.get("digest")
+                entries = data.get("sets", [])
+        except (OSError, ValueError) as e:
+            logger.warning(f"単語セットカタログを読み込めませんでした: {path} ({str(e)})")
+            entries = []
+        _file_cache = (mtime, digest, entries)
+        return digest, entries
+
+
+def write_catalog(path: str, digest: str, entries: List[Dict[str, Any]]) -> None:
+    """カタログをファイルに書き出す（一時ファイルに書いてから置き換える）"""
+    data = {"format": CATALOG_FORMAT_VERSION, "digest": digest, "sets": entries}
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+class TermSetCatalog:
+    """
+    用語索引の行番号に解決した単語セットカタログ
+
+    エントリの用語は大文字のキーで保存されているため、辞書が更新されても
+    すべての用語が残っているセットはそのまま使える。用語索引のバージョンごとに一度だけ構築する。
+    全消し可能なセットがある場合はその中から、なければ配置可能なセット全体から選ぶ。
+    セットの平均難易度で重み付けしたエイリアス表をモードごとに作り、O(1)で抽選する。
+
+    生成時と辞書のdigestが異なり、抽選対象のセットが盤面に収まる用語の min_coverage 未満しか
+    含まない場合はカタログを使わない（空のカタログになり、呼び出し側が実行時の抽選にフォールバックする）。
+    別の辞書から作ったカタログで、一部の用語だけが出題され続けるのを防ぐ。
+    """
+
+    __slots__ = ("rows", "full_clear", "coverage", "difficulty", "term_coverage", "rejected",
+                 "_pool", "_members", "_tables", "_hits", "_misses")
+
+    def __init__(self, rows_by_key: Dict[str, int], entries: List[Dict[str, Any]],
+                 catalog_digest: Optional[str] = None, index_digest: Optional[str] = None,
+                 min_coverage: float = TERM_CATALOG_MIN_COVERAGE):
+        """
+        Args:
+            rows_by_key: 大文字の用語 -> 用語索引の行番号
+            entries: カタログのエントリ
+            catalog_digest: カタログを生成したときの用語索引のdigest
+            index_digest: 現在の用語索引のdigest
+            min_coverage: digestが異なる場合にカタログを使うのに必要な被覆率
+        """
+        rows: List[List[int]] = []
+        full_clear: List[bool] = []
+        coverage: List[float] = []
+        difficulty: List[float] = []
+        for entry in entries:
+            keys = entry.get("terms", [])
+            if keys and all(key in rows_by_key for key in keys):
+                rows.append([rows_by_key[key] for key in keys])
+                full_clear.append(bool(entry.get("full_clear")))
+                coverage.append(float(entry.get("coverage", 0.0)))
+                difficulty.append(float(entry.get("difficulty", 1.0)))
+
+        # 抽選対象のセット（全消し可能なものがあればそれだけ）に含まれる用語の割合
+        sampled = [row for row, clear in zip(rows, full_clear) if clear] if any(full_clear) else rows
+        eligible = sum(1 for key in rows_by_key if 0 < len(key) <= GRID_SIZE)
+        self.term_coverage = len({row for members in sampled for row in members}) / eligible if eligible else 0.0
+        self.rejected = bool(entries) and catalog_digest != index_digest and self.term_coverage < min_coverage
+        if self.rejected:
+            logger.warning(f"単語セットカタログは別の辞書（{catalog_digest}）から生成され、"
+                           f"現在の辞書（{index_digest}）の用語を{self.term_coverage:.1%}しか含まないため使用しません")
+            rows, full_clear, coverage, difficulty = [], [], [], []
+
+        width = max((len(row) for row in rows), default=0)
+        # 行番号の行列（用語数が少ないセットは -1 で埋める）
+        self.rows = np.full((len(rows), width), -1, dtype=np.int32)
+        for i, row in enumerate(rows):
+            self.rows[i, :len(row)] = row
+        self.full_clear = np.array(full_clear, dtype=bool)
+        self.coverage = np.array(coverage, dtype=np.float32)
+        self.difficulty = np.array(difficulty, dtype=np.float32)
+
+        pool = np.flatnonzero(self.full_clear) if self.full_clear.any() else np.arange(len(rows))
+        self._pool = pool.tolist()
+        # セットごとの行番号（抽選のたびにnumpy配列を変換しない）
+        self._members = [self.rows[i][self.rows[i] >= 0].tolist() for i in self._pool]
+        self._tables: Dict[str, AliasTable] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def _table(self, mode: str) -> AliasTable:
+        table = self._tables.get(mode)
+        if table is None:
+            table = difficulty_table([float(self.difficulty[i]) for i in self._pool], mode)
+            self._tables[mode] = table
+        return table
+
+    def sample(self, rng, excluded: int = 0, mode: str = TERM_DIFFICULTY_MODE) -> Optional[List[int]]:
+        """
+        カタログから単語セットを1つ選ぶ
+
+        Args:
+            rng: 乱数生成器（randrange と random を持つもの）
+            excluded: 除外する用語索引の行のビットセット。除外語を含まないセットだけを選ぶ
+            mode: 難易度の重み付けモード
+
+        Returns:
+            選択したセットの行番号のリスト。条件に合うセットがない場合はNone
+        """
+        if self._pool:
+            table = self._table(mode)
+            for _ in range(CATALOG_SAMPLE_ATTEMPTS):
+                rows = self._members[table.draw(rng)]
+                if not any((excluded >> row) & 1 for row in rows):
+                    self._hits += 1
+                    return list(rows)
+        self._misses += 1
+        return None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get_stats(self) -> Dict[str, object]:
+        """カタログの統計情報を取得"""
+        return {
+            "sets": len(self.rows),
+            "full_clear_sets": int(self.full_clear.sum()),
+            "term_coverage": self.term_coverage,
+            "rejected": self.rejected,
+            "hits": self._hits,
+            "misses": self._misses,
+        }
@@ -0,0 +1,328 @@
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from models import ITTerm
+from data.term_trie import TermTrie
+from data.term_letters import LetterCountMatrix
+from data.term_catalog import TermSetCatalog, load_catalog
+from data.term_sampler import TermSampler
+from data.term_search import TermSearchIndex
+
+# 用語一覧の並び替えのキー（/api/terms の sort_by）
+SORT_KEYS: Dict[str, Callable[[ITTerm], Any]] = {
+    "term": lambda term: term.term.lower(),
+    "fullName": lambda term: term.fullName.lower(),
+    "difficulty": lambda term: term.difficulty,
+}
+
+
+class TermIndex:
+    """
+    キャッシュ更新ごとに一度だけ構築する用語索引
+
+    用語の索引部分は構築後に変更しない。キャッシュが更新されたら新しいバージョンを作って差し替える。
+    一部の用語だけが変わった場合は with_changes で変更のない部分を引き継いだ新しいバージョンを作る。
+    """
+
+    __slots__ = ("version", "digest", "terms", "by_key", "rows", "letters", "sampler",
+                 "_trie", "_catalog", "_orderings", "_positions", "_search", "_search_lock")
+
+    def __init__(self, version: int, digest: str, terms: Tuple[ITTerm, ...], by_key: Dict[str, ITTerm],
+                 rows: Optional[Dict[str, int]] = None, letters: Optional[LetterCountMatrix] = None,
+                 sampler: Optional[TermSampler] = None, search: Optional[TermSearchIndex] = None):
+        self.version = version  # プロセス内で単調増加するバージョン
+        self.digest = digest  # 内容から計算した識別子（ワーカー間で共通）
+        self.terms = terms
+        self.by_key = by_key  # 大文字の用語 -> ITTerm
+        # 大文字の用語 -> termsでの位置
+        self.rows = rows if rows is not None else {key: row for row, key in enumerate(by_key)}
+        # 用語ごとの文字数（単語セット選択用）
+        self.letters = letters if letters is not None else LetterCountMatrix(terms)
+        # 難易度で重み付けした抽選
+        self.sampler = sampler if sampler is not None else TermSampler([term.difficulty for term in terms])
+        self._trie: Optional[TermTrie] = None
+        self._catalog: Optional[TermSetCatalog] = None
+        self._orderings: Dict[Tuple[str, bool], Tuple[int, ...]] = {}
+        self._positions: Dict[Tuple[str, bool], List[int]] = {}
+        self._search = search
+        self._search_lock = threading.Lock()
+
+    @classmethod
+    def build(cls, terms: Iterable[ITTerm], version: int) -> 'TermIndex':
+        """用語リストから索引を構築（同じ用語が複数ある場合は最初のものを使う）"""
+        by_key = _unique_terms(terms)
+        return cls(version, _digest_of(by_key.values()), tuple(by_key.values()), by_key)
+
+    def with_changes(self, changed: Iterable[ITTerm], version: int) -> 'TermIndex':
+        """
+        追加・更新された用語を反映した新しいバージョンを作る（このバージョンは変更しない）
+
+        変更のない用語の文字数行列・検索索引は作り直さずに引き継ぐ。
+        同じ用語が複数回含まれる場合は最後のものを使う（更新日時の順に渡す）。
+        計算済みの並び順は変わった行だけを並べ直す。プレフィックス木は新しいバージョンで初めて使うときに、
+        カタログは prepare_views で作り直す。
+
+        Returns:
+            新しい索引。実際に変わった用語がない場合はこの索引自身
+        """
+        latest: Dict[str, ITTerm] = {}
+        for term in changed:
+            key = term.term.upper()
+            if self.by_key.get(key) != term:
+                latest[key] = term
+        if not latest:
+            return self
+
+        by_key = dict(self.by_key)
+        rows = dict(self.rows)
+        terms = list(self.terms)
+        replaced: Dict[int, ITTerm] = {}
+        appended: List[ITTerm] = []
+        digest_sum = int(self.digest, 16)
+
+        for key, term in latest.items():
+            row = rows.get(key)
+            if row is None:
+                rows[key] = len(terms)
+                terms.append(term)
+                appended.append(term)
+            else:
+                digest_sum -= _term_hash(terms[row])
+                terms[row] = term
+                replaced[row] = term
+            by_key[key] = term
+            digest_sum += _term_hash(term)
+
+        index = TermIndex(
+            version,
+            _format_digest(digest_sum),
+            tuple(terms),
+            by_key,
+            rows=rows,
+            letters=self.letters.with_changes(replaced, appended),
+            sampler=self.sampler.with_changes(
+                {row: term.difficulty for row, term in replaced.items()},
+                [term.difficulty for term in appended]),
+            search=self._search.with_changes(replaced, appended) if self._search is not None else None,
+        )
+        # 計算済みの並び順は変わった行だけを並べ直して引き継ぐ
+        changed_rows = set(replaced) | set(range(len(self.terms), len(terms)))
+        for (sort_by, descending), order in list(self._orderings.items()):
+            if sort_by in SORT_KEYS:
+                index._orderings[(sort_by, descending)] = index._reorder(order, changed_rows, sort_by, descending)
+        return index
+
+    def lookup(self, term_str: str) -> Optional[ITTerm]:
+        """大文字小文字を区別せずに用語を検索"""
+        return self.by_key.get(term_str.upper())
+
+    @property
+    def trie(self) -> TermTrie:
+        """このバージョンのプレフィックス木（初回アクセス時に構築）"""
+        if self._trie is None:
+            self._trie = TermTrie(self.by_key, self.digest)
+        return self._trie
+
+    @property
+    def catalog(self) -> TermSetCatalog:
+        """このバージョンの用語で構成できる単語セットカタログ（prepare_views で事前に構築する）"""
+        if self._catalog is None:
+            catalog_digest, entries = load_catalog()
+            self._catalog = TermSetCatalog(self.rows, entries, catalog_digest, self.digest)
+        return self._catalog
+
+    def row_numbers(self, terms: Iterable[ITTerm]) -> List[int]:
+        """用語の行番号（索引にない用語は無視する）"""
+        return [self.rows[key] for key in (term.term.upper() for term in terms) if key in self.rows]
+
+    def ordering(self, sort_by: str, descending: bool = False) -> Tuple[int, ...]:
+        """
+        並び替えた行番号の列（バージョンごとに一度だけ計算し、以降は同じタプルを返す）
+
+        未知のキーの場合は索引の順番のまま。降順は昇順の逆順ではなく、同じキーの用語の順番を保った安定ソート。
+        """
+        key = (sort_by, descending)
+        order = self._orderings.get(key)
+        if order is None:
+            sort_key = SORT_KEYS.get(sort_by)
+            if sort_key is None:
+                order = tuple(range(len(self.terms)))
+            else:
+                terms = self.terms
+                order = tuple(sorted(range(len(terms)), key=lambda row: sort_key(terms[row]), reverse=descending))
+            # 競合しても同じ結果になるだけなのでロックしない
+            self._orderings[key] = order
+        return order
+
+    def _reorder(self, order: Tuple[int, ...], changed_rows: Set[int], sort_by: str,
+                 descending: bool) -> Tuple[int, ...]:
+        """
+        前のバージョンの並び順から変わった行を取り除き、二分探索で挿入し直す
+
+        ordering の安定ソートと同じく、キーが同じ行は行番号の昇順に並べる。
+        """
+        sort_key = SORT_KEYS[sort_by]
+        terms = self.terms
+        if any(row < len(order) for row in changed_rows):
+            rows = [row for row in order if row not in changed_rows]
+        else:
+            rows = list(order)  # 追加だけの場合は取り除く行がない
+        for row in sorted(changed_rows):
+            value = sort_key(terms[row])
+            lo, hi = 0, len(rows)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                other = sort_key(terms[rows[mid]])
+                if (other > value if descending else other < value) or (other == value and rows[mid] < row):
+                    lo = mid + 1
+                else:
+                    hi = mid
+            rows.insert(lo, row)
+        return tuple(rows)
+
+    @property
+    def search_index(self) -> TermSearchIndex:
+        """このバージョンの全文検索用のN-gram索引（初回アクセス時に一度だけ構築し、同時のアクセスは構築を待つ）"""
+        if self._search is None:
+            with self._search_lock:
+                if self._search is None:
+                    self._search = TermSearchIndex.build(self.terms)
+        return self._search
+
+    def search(self, query: str, sort_by: str, descending: bool = False) -> List[int]:
+        """
+        用語・正式名称・説明文のいずれかに検索語を含む行番号
+
+        用語に一致したもの、正式名称に一致したもの、説明文だけに一致したものの順に並べ、
+        それぞれの中は ordering(sort_by, descending) の順にする。
+        """
+        matches = self.search_index.find(query)
+        key = (sort_by, descending)
+        positions = self._positions.get(key)
+        if positions is None:
+            positions = [0] * len(self.terms)
+            for position, row in enumerate(self.ordering(sort_by, descending)):
+                positions[row] = position
+            self._positions[key] = positions
+        return sorted(matches, key=lambda row: (matches[row], positions[row]))
+
+    def prepare_views(self) -> None:
+        """一覧の並び順・検索索引・単語セットカタログを事前に作成（新しいバージョンに差し替える前に呼ぶ）"""
+        for sort_by in SORT_KEYS:
+            for descending in (False, True):
+                self.ordering(sort_by, descending)
+        self.search_index
+        self.catalog
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def get_stats(self) -> Dict[str, object]:
+        """索引の統計情報を取得"""
+        return {
+            "version": self.version,
+            "digest": self.digest,
+            "terms": len(self.terms),
+        }
+
+
+def _term_hash(term: ITTerm) -> int:
+    """用語1件分のハッシュ（64ビット）"""
+    data = f"{term.term}\t{term.fullName}\t{term.description}\t{term.difficulty}".encode("utf-8")
+    return int.from_bytes(hashlib.sha1(data).digest()[:8], "big")
+
+
+def _unique_terms(terms: Iterable[ITTerm]) -> Dict[str, ITTerm]:
+    """大文字の用語 -> 用語（同じ用語が複数ある場合は最初のもの）"""
+    by_key: Dict[str, ITTerm] = {}
+    for term in terms:
+        by_key.setdefault(term.term.upper(), term)
+    return by_key
+
+
+def _digest_of(terms: Iterable[ITTerm]) -> str:
+    return _format_digest(sum(_term_hash(term) for term in terms))
+
+
+def terms_digest(terms: Iterable[ITTerm]) -> str:
+    """用語リストから構築した索引の digest（索引を構築せずに内容が変わったかを判定する）"""
+    return _digest_of(_unique_terms(terms).values())
+
+
+def _format_digest(digest_sum: int) -> str:
+    """
+    用語ごとのハッシュの和（2^64を法とする）を索引の識別子にする
+
+    順番によらず内容だけで決まり、用語の追加・更新は差分だけで計算し直せる。
+    """
+    return f"{digest_sum % (1 << 64):016x}"
+
+
+class TermRegistry:
+    """
+    用語と小さな整数IDの対応表（セッションは用語そのものではなくIDを保持する）
+
+    一度割り当てたIDは辞書が更新されても変わらず、別の用語に使い回すこともない。
+    内容が変わった用語には新しいIDを割り当てるため、古いセッションは当時の用語を参照し続ける。
+    どのセッションからも参照されなくなった用語は retain で取り除く。
+    """
+
+    def __init__(self):
+        self._terms: Dict[int, ITTerm] = {}
+        self._ids: Dict[Tuple[str, str, str, int], int] = {}
+        # ID -> 最後に intern された時刻（time.monotonic）
+        self._last_used: Dict[int, float] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(term: ITTerm) -> Tuple[str, str, str, int]:
+        return term.term, term.fullName, term.description, term.difficulty
+
+    def intern(self, term: ITTerm) -> int:
+        """用語のIDを取得（未登録なら割り当てる）"""
+        key = self._key(term)
+        now = time.monotonic()
+        # retain と同時に実行されても、返したIDが取り除かれないようロック中に使用時刻を更新する
+        with self._lock:
+            term_id = self._ids.get(key)
+            if term_id is None:
+                term_id = self._next_id
+                self._next_id += 1
+                self._terms[term_id] = term
+                self._ids[key] = term_id
+            self._last_used[term_id] = now
+        return term_id
+
+    def get(self, term_id: int) -> ITTerm:
+        """IDから用語を取得"""
+        return self._terms[term_id]
+
+    def retain(self, live_ids: Set[int], idle_seconds: float) -> int:
+        """
+        参照されていない用語を取り除く
+
+        Args:
+            live_ids: セッションが参照しているID（取り除かない）
+            idle_seconds: 最後に intern されてからこの秒数が経っていないIDも取り除かない
+                （処理中のリクエストや、IDを一覧に含められないストアから読み込んだセッションのため）
+
+        Returns:
+            取り除いた用語の数
+        """
+        cutoff = time.monotonic() - idle_seconds
+        with self._lock:
+            stale = [term_id for term_id, used in self._last_used.items()
+                     if used < cutoff and term_id not in live_ids]
+            for term_id in stale:
+                del self._ids[self._key(self._terms.pop(term_id))]
+                del self._last_used[term_id]
+        return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+
+# プロセス全体で共有する用語IDの対応表
+term_registry = TermRegistry()
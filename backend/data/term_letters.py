@@ -0,0 +1,101 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from models import ITTerm
+
+
+class LetterCountMatrix:
+    """
+    用語ごとの文字数を並べた行列（行: 用語、列: 辞書に出てくる文字）
+
+    用語索引のバージョンごとに一度だけ構築する。ある文字頻度ベクトルとの重なりは
+    counts @ frequency の1回の行列ベクトル積で全用語分まとめて計算できる。
+    """
+
+    __slots__ = ("columns", "counts")
+
+    def __init__(self, terms: Sequence[ITTerm]):
+        alphabet = sorted({char for term in terms for char in term.term})
+        self.columns: Dict[str, int] = {char: column for column, char in enumerate(alphabet)}
+
+        counts = np.zeros((len(terms), len(alphabet)), dtype=np.int32)
+        for row, term in enumerate(terms):
+            for char in term.term:
+                counts[row, self.columns[char]] += 1
+        self.counts = counts
+
+    def with_changes(self, replaced: Dict[int, ITTerm], appended: Sequence[ITTerm]) -> 'LetterCountMatrix':
+        """
+        一部の行を差し替え・追加した新しい行列を作る（元の行列は変更しない）
+
+        変更のない行は数え直さずにコピーする。新しい文字が出てきた場合は列を追加する。
+        """
+        columns = dict(self.columns)
+        for term in list(replaced.values()) + list(appended):
+            for char in term.term:
+                columns.setdefault(char, len(columns))
+
+        counts = np.zeros((len(self) + len(appended), len(columns)), dtype=np.int32)
+        counts[:len(self), :len(self.columns)] = self.counts
+        for row, term in list(replaced.items()) + list(enumerate(appended, start=len(self))):
+            counts[row] = 0
+            for char in term.term:
+                counts[row, columns[char]] += 1
+
+        matrix = LetterCountMatrix.__new__(LetterCountMatrix)
+        matrix.columns = columns
+        matrix.counts = counts
+        return matrix
+
+    def __len__(self) -> int:
+        return self.counts.shape[0]
+
+
+def select_rows_with_minimal_overlap(matrix: LetterCountMatrix, candidates: np.ndarray, count: int,
+                                     rng, improvement_attempts: int = 20) -> List[int]:
+    """
+    文字の重なりが少なくなるように行（用語）を選択する
+
+    ランダムな初期セットから、選択中の1語を外して残りとの重なりが最も少ない候補と入れ替える。
+    候補ごとの重なりは行列ベクトル積で計算する。
+
+    Args:
+        matrix: 用語の文字数行列
+        candidates: 選択対象の行番号
+        count: 選択する用語数
+        rng: 乱数生成器（sample と choice を持つもの）
+        improvement_attempts: 入れ替えを試みる回数
+
+    Returns:
+        選択された行番号のリスト
+    """
+    candidate_list = candidates.tolist()
+    if len(candidate_list) <= count:
+        return candidate_list
+
+    # 候補だけの部分行列（行の順番は candidates の順）
+    counts = matrix.counts[candidates]
+    selected = rng.sample(range(len(candidate_list)), count)
+    in_selection = np.zeros(len(candidate_list), dtype=bool)
+    in_selection[selected] = True
+
+    for _ in range(improvement_attempts):
+        if in_selection.all():
+            break
+
+        # ランダムに入れ替える用語を選択し、それ以外の選択中の文字頻度を計算
+        to_replace = rng.choice(selected)
+        frequency = counts[in_selection].sum(axis=0) - counts[to_replace]
+
+        # 未選択の候補の中で最も重なりが少ないもの（同点なら先頭）を探す
+        overlap = counts @ frequency
+        overlap[in_selection] = np.iinfo(overlap.dtype).max
+        best = int(np.argmin(overlap))
+
+        selected.remove(to_replace)
+        selected.append(best)
+        in_selection[to_replace] = False
+        in_selection[best] = True
+
+    return [candidate_list[i] for i in selected]
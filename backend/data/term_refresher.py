@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRefresher:
+    """
+    キャッシュをバックグラウンドスレッドで定期的に更新する（stale-while-revalidate）
+
+    リクエストは常に現在のキャッシュをそのまま使い、更新はこのスレッドだけが行う。
+    次の更新までの秒数は呼び出し側の due_in で決め（キャッシュの経過時間や遮断中の待ち時間など）、
+    失敗した場合は少なくとも retry_delay 秒空けてから再試行する。
+    """
+
+    def __init__(self, name: str, refresh: Callable[[], bool], due_in: Callable[[], float],
+                 retry_delay: float):
+        """
+        Args:
+            name: スレッド名
+            refresh: 更新処理（成功したらTrue）
+            due_in: 次の更新までの秒数（0以下ならすぐに更新する）
+            retry_delay: 失敗後に再試行するまでの最小の秒数
+        """
+        self.name = name
+        self._refresh = refresh
+        self._due_in = due_in
+        self.retry_delay = retry_delay
+
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._worker: Optional[threading.Thread] = None
+
+        # 統計情報
+        self._refreshes = 0
+        self._failures = 0
+        self._last_failed = False
+        self._last_attempt: Optional[float] = None
+        self._last_duration = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    def start(self) -> None:
+        """更新スレッドを起動"""
+        if self.running:
+            return
+        self._stopping = False
+        self._wakeup.clear()
+        self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._worker.start()
+        logger.info(f"{self.name}: バックグラウンド更新を開始しました")
+
+    def stop(self) -> None:
+        """更新スレッドを停止（更新処理の途中の場合は終わるまで最大5秒待つ）"""
+        if self._worker and self._worker.is_alive():
+            self._stopping = True
+            self._wakeup.set()
+            self._worker.join(timeout=5)
+        self._worker = None
+
+    def _run(self) -> None:
+        while not self._stopping:
+            wait = self._due_in()
+            if self._last_failed:
+                wait = max(wait, self.retry_delay)
+            if wait > 0 and self._wakeup.wait(timeout=wait):
+                self._wakeup.clear()
+            if self._stopping:
+                break
+
+            started = time.monotonic()
+            try:
+                ok = self._refresh()
+            except Exception as e:
+                logger.error(f"{self.name}: 更新中にエラーが発生しました: {str(e)}")
+                ok = False
+            self._last_attempt = time.time()
+            self._last_duration = time.monotonic() - started
+            self._last_failed = not ok
+            if ok:
+                self._refreshes += 1
+            else:
+                self._failures += 1
+
+    def get_stats(self) -> Dict[str, object]:
+        """更新の統計情報を取得"""
+        return {
+            "running": self.running,
+            "refreshes": self._refreshes,
+            "failures": self._failures,
+            "last_attempt": self._last_attempt,
+            "last_duration_ms": self._last_duration * 1000,
+            "next_refresh_in_seconds": max(0.0, self._due_in()),
+        }
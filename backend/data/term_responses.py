@@ -0,0 +1,218 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from pydantic import TypeAdapter
+
+from models import ITTerm
+from data.term_index import TermIndex
+
+try:
+    import brotli
+except ImportError:  # brotliがない環境ではgzipだけを返す
+    brotli = None
+
+# エンコード済みのレスポンスを保持する上限（検索語・並び順・ページの組み合わせごとに1件）
+TERM_RESPONSE_CACHE_SIZE = int(os.environ.get("TERM_RESPONSE_CACHE_SIZE", "256"))
+
+# これより小さい本文は圧縮しない（バイト）
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+# クライアントが対応していれば優先して使う順
+ENCODINGS = ("br", "gzip")
+
+_terms_adapter = TypeAdapter(List[ITTerm])
+
+# (バージョン, 検索語, 並び替えのキー, 降順, ページ, 1ページの件数)
+ResponseKey = Tuple[int, str, str, bool, int, Optional[int]]
+
+
+class EncodedTerms(NamedTuple):
+    """エンコード済みの用語一覧・プレフィックス木（本文と圧縮したもの）"""
+    etag: str  # 本文の内容から計算した強いETag（引用符を含む）
+    total: int  # ページ分割前の件数（プレフィックス木は用語数）
+    bodies: Dict[str, bytes]  # Content-Encoding（無圧縮は "identity"）-> 本文
+
+    def etag_for(self, encoding: str) -> str:
+        """エンコーディングごとのETag（同じ内容でもバイト列が違うため区別する）"""
+        if encoding == "identity":
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+
+def _select_rows(index: TermIndex, search: str, sort_by: str, descending: bool) -> Tuple[int, ...]:
+    if search:
+        return tuple(index.search(search, sort_by, descending))
+    return index.ordering(sort_by, descending)
+
+
+def _compress(body: bytes) -> Dict[str, bytes]:
+    bodies = {"identity": body}
+    if len(body) >= COMPRESS_MIN_BYTES:
+        bodies["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        if brotli is not None:
+            bodies["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return bodies
+
+
+def _encode(terms: List[ITTerm], total: int) -> EncodedTerms:
+    body = _terms_adapter.dump_json(terms)
+    etag = f'"terms-{hashlib.sha1(body).hexdigest()[:20]}"'
+    return EncodedTerms(etag, total, _compress(body))
+
+
+def _encode_trie(index: TermIndex) -> EncodedTerms:
+    trie = index.trie
+    body = json.dumps(trie.serialize(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    # プレフィックス木は辞書の内容だけで決まるため、辞書のdigestをそのままETagにする
+    return EncodedTerms(f'"trie-{trie.version}"', len(index), _compress(body))
+
+
+class TermResponseCache:
+    """
+    /api/terms と /api/terms/trie のレスポンスをエンコード済みのバイト列で保持するキャッシュ
+
+    用語索引のバージョン・検索語・並び順・ページごとに、JSONの本文とgzip/brotliで圧縮したものを一度だけ作る。
+    用語索引が新しいバージョンに差し替わると古いバージョンのものは捨てる。
+    ETagは本文の内容から計算するため、ワーカーや再起動をまたいでも同じ一覧なら同じ値になる。
+    """
+
+    def __init__(self, max_entries: int = TERM_RESPONSE_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[ResponseKey, EncodedTerms]" = OrderedDict()
+        self._version: Optional[int] = None
+        # プレフィックス木のレスポンス（用語索引のバージョン, エンコード済みのもの）
+        self._trie: Optional[Tuple[int, EncodedTerms]] = None
+        self._lock = threading.Lock()
+
+        # 統計情報
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, index: TermIndex, search: Optional[str], sort_by: str, descending: bool,
+            page: int = 1, page_size: Optional[int] = None) -> EncodedTerms:
+        """
+        指定した一覧のエンコード済みレスポンスを取得（なければ作成してキャッシュする）
+
+        Args:
+            index: 用語索引（このバージョンの一覧を返す）
+            search: 検索語（空ならすべての用語）
+            sort_by: 並び替えのキー
+            descending: 降順か
+            page: ページ番号（1から）
+            page_size: 1ページの件数（Noneまたは0以下ならすべて）
+        """
+        if page_size is not None and page_size <= 0:
+            page_size = None
+        page = max(page, 1) if page_size is not None else 1
+        key = (index.version, search or "", sort_by, descending, page, page_size)
+
+        with self._lock:
+            if index.version != self._version:
+                if self._version is None or index.version > self._version:
+                    self._entries.clear()
+                    self._version = index.version
+            else:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry
+            self._misses += 1
+
+        # エンコードと圧縮はロックの外で行う（競合しても同じものができるだけ）
+        rows = _select_rows(index, search or "", sort_by, descending)
+        total = len(rows)
+        if page_size is not None:
+            start = (page - 1) * page_size
+            rows = rows[start:start + page_size]
+        terms = index.terms
+        entry = _encode([terms[row] for row in rows], total)
+
+        with self._lock:
+            if index.version == self._version:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def get_trie(self, index: TermIndex) -> EncodedTerms:
+        """プレフィックス木のエンコード済みレスポンスを取得（用語索引のバージョンごとに一度だけ作る）"""
+        cached = self._trie
+        if cached is not None and cached[0] == index.version:
+            return cached[1]
+
+        # エンコードと圧縮はロックの外で行う（競合しても同じものができるだけ）
+        entry = _encode_trie(index)
+        with self._lock:
+            if self._trie is None or self._trie[0] < index.version:
+                self._trie = (index.version, entry)
+        return entry
+
+    def prepare(self, index: TermIndex) -> None:
+        """用語一覧の既定の表示（検索なし・用語順・全件）を事前に作成（新しいバージョンを差し替えた直後に呼ぶ）"""
+        self.get(index, None, "term", False)
+
+    def get_stats(self) -> Dict[str, object]:
+        """キャッシュの統計情報を取得"""
+        total = self._hits + self._misses
+        return {
+            "version": self._version,
+            "entries": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": self._hits / total if total else 0.0,
+            "brotli": brotli is not None,
+        }
+
+
+def choose_encoding(accept_encoding: Optional[str], available: Dict[str, bytes]) -> str:
+    """Accept-Encodingから返すエンコーディングを選ぶ（q=0は拒否として扱う）"""
+    if not accept_encoding:
+        return "identity"
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def etag_matches(if_none_match: Optional[str], entry: EncodedTerms) -> bool:
+    """
+    If-None-Matchが一覧のETagのいずれかと一致するか
+
+    If-None-Matchは弱い比較のため W/ を無視し、圧縮の種類が違うETagも同じ内容として一致とみなす。
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {entry.etag_for(encoding) for encoding in ENCODINGS + ("identity",)}
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag in tags:
+            return True
+    return False
+
+
+# プロセス全体で共有する /api/terms のレスポンスキャッシュ
+term_response_cache = TermResponseCache()
@@ -0,0 +1,137 @@
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+# 単語セットを選ぶときの難易度の重み付け（"uniform", "easy", "hard"）
+TERM_DIFFICULTY_MODE = os.environ.get("TERM_DIFFICULTY_MODE", "uniform").lower()
+
+# 単語セットを選ぶ前に難易度で重み付けして抽選する候補数（この中で文字の重なりが少ない組み合わせを探す）
+TERM_CANDIDATE_POOL = int(os.environ.get("TERM_CANDIDATE_POOL", "64"))
+
+# 難易度 -> 抽選の重み
+DIFFICULTY_WEIGHTS: Dict[str, Callable[[float], float]] = {
+    "uniform": lambda difficulty: 1.0,
+    "easy": lambda difficulty: 1.0 / max(difficulty, 1.0),  # 易しい用語ほど出やすい
+    "hard": lambda difficulty: max(difficulty, 1.0),  # 難しい用語ほど出やすい
+}
+
+# 除外・重複で棄却されたときに引き直す回数の上限（1語あたり）
+_REDRAW_LIMIT = 16
+
+
+class AliasTable:
+    """
+    重み付き抽選のためのWalkerのエイリアス表
+
+    構築はO(n)、1回の抽選は乱数2つと配列参照だけのO(1)。
+    """
+
+    __slots__ = ("_prob", "_alias")
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        total = float(sum(weights))
+        self._prob = [1.0] * n
+        self._alias = list(range(n))
+        if n == 0 or total <= 0:
+            return
+
+        # 平均が1になるように正規化し、1未満（small）と1以上（large）を組み合わせる（Voseの方法）
+        scaled = [weight * n / total for weight in weights]
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large[-1]
+            self._prob[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            if scaled[more] < 1.0:
+                small.append(large.pop())
+        # 誤差で残ったものは確率1
+        for i in small + large:
+            self._prob[i] = 1.0
+
+    def draw(self, rng) -> int:
+        """重みに比例した確率で番号を1つ返す"""
+        i = rng.randrange(len(self._prob))
+        return i if rng.random() < self._prob[i] else self._alias[i]
+
+    def __len__(self) -> int:
+        return len(self._prob)
+
+
+def difficulty_table(difficulties: Sequence[float], mode: str) -> AliasTable:
+    """難易度のリストから指定したモードのエイリアス表を作成（未知のモードは一様）"""
+    weight = DIFFICULTY_WEIGHTS.get(mode, DIFFICULTY_WEIGHTS["uniform"])
+    return AliasTable([weight(difficulty) for difficulty in difficulties])
+
+
+def to_bitset(rows: Iterable[int]) -> int:
+    """行番号の集合をビットセット（int）に変換"""
+    bits = 0
+    for row in rows:
+        bits |= 1 << row
+    return bits
+
+
+class TermSampler:
+    """
+    用語索引の行を難易度で重み付けして抽選するサンプラー
+
+    用語索引のバージョンごとに一度だけ作り、エイリアス表はモードごとに初回使用時に構築する。
+    除外する用語は行番号のビットセットで渡し、抽選した行を棄却して引き直すため、
+    呼び出しごとに候補リストを作り直さない。
+    """
+
+    __slots__ = ("_difficulties", "_tables")
+
+    def __init__(self, difficulties: Sequence[float]):
+        self._difficulties = list(difficulties)
+        self._tables: Dict[str, AliasTable] = {}
+
+    def with_changes(self, replaced: Dict[int, float], appended: Sequence[float]) -> 'TermSampler':
+        """一部の行の難易度を差し替え・追加した新しいサンプラー（エイリアス表は使うときに作り直す）"""
+        difficulties = self._difficulties + list(appended)
+        for row, difficulty in replaced.items():
+            difficulties[row] = difficulty
+        return TermSampler(difficulties)
+
+    def table(self, mode: str = TERM_DIFFICULTY_MODE) -> AliasTable:
+        """モードのエイリアス表（初回のみ構築。競合しても同じ表ができるだけなのでロックしない）"""
+        table = self._tables.get(mode)
+        if table is None:
+            table = difficulty_table(self._difficulties, mode)
+            self._tables[mode] = table
+        return table
+
+    def draw(self, rng, count: int, excluded: int = 0,
+             mode: str = TERM_DIFFICULTY_MODE) -> Optional[List[int]]:
+        """
+        重複なしでcount個の行を抽選する
+
+        Args:
+            rng: 乱数生成器（randrange と random を持つもの）
+            count: 抽選する行数
+            excluded: 除外する行のビットセット
+            mode: 難易度の重み付けモード
+
+        Returns:
+            抽選した行番号のリスト。引き直しの上限までに揃わなかった場合はNone
+        """
+        table = self.table(mode)
+        if len(table) < count:
+            return None
+
+        selected: List[int] = []
+        taken = excluded
+        for _ in range(count * _REDRAW_LIMIT):
+            row = table.draw(rng)
+            if not (taken >> row) & 1:
+                selected.append(row)
+                if len(selected) == count:
+                    return selected
+                taken |= 1 << row
+        return None
+
+    def __len__(self) -> int:
+        return len(self._difficulties)
@@ -0,0 +1,193 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from models import ITTerm
+
+# 検索語が一致した項目ごとの順位（小さいほど上位）
+RANK_TERM = 0  # 用語
+RANK_FULL_NAME = 1  # 正式名称
+RANK_DESCRIPTION = 2  # 説明文のみ
+
+# 索引に登録するN-gramの長さ（これより長い検索語は最長のN-gramの積集合で候補を絞る）
+MAX_GRAM = 3
+
+# N-gramは文字コード（21ビット）を並べた整数で表す。短いN-gramは上位を0で埋めるため、
+# 区切り文字（0）を含まないN-gramどうしで長さが違っても値は重ならない
+_CODE_BITS = 21
+_SEPARATOR = "\x00"
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+Fields = Tuple[str, str, str]
+
+
+def _fields(term: ITTerm) -> Fields:
+    """行ごとの (用語, 正式名称, 説明文)（小文字。区切り文字は索引に入らないよう取り除く）"""
+    return tuple(text.lower().replace(_SEPARATOR, "")
+                 for text in (term.term, term.fullName, term.description))
+
+
+def _gram_key(gram: str) -> int:
+    key = 0
+    for char in gram:
+        key = (key << _CODE_BITS) | ord(char)
+    return key
+
+
+def _gram_keys(texts: Iterable[str], n_values: Iterable[int] = range(1, MAX_GRAM + 1)) -> Set[int]:
+    """文字列に含まれるN-gramの整数表現"""
+    keys: Set[int] = set()
+    for text in texts:
+        for n in n_values:
+            keys.update(_gram_key(text[i:i + n]) for i in range(len(text) - n + 1))
+    return keys
+
+
+class TermSearchIndex:
+    """
+    用語・正式名称・説明文の文字N-gram（1〜3文字）の転置索引
+
+    日本語の説明文は単語に分割せず文字単位で索引にする。検索語のN-gramを含む行の積集合を候補とし、
+    実際に部分文字列として含むかを確認してから返すため、結果は小文字にした部分一致の全件走査と同じになる。
+
+    ポスティングはN-gramの値で並べた1つの行番号の配列にまとめ（CSR形式）、構築はNumPyの一括処理で行う。
+    用語の追加・更新は with_changes で変わったN-gramのポスティングだけを作り直し（コピーオンライト）、
+    残りは前のバージョンと共有する。
+    """
+
+    __slots__ = ("_fields", "_keys", "_offsets", "_rows", "_overrides")
+
+    def __init__(self, fields: List[Fields], keys: np.ndarray, offsets: np.ndarray, rows: np.ndarray,
+                 overrides: Optional[Dict[int, np.ndarray]] = None):
+        self._fields = fields
+        self._keys = keys  # N-gramの値（昇順・重複なし）
+        self._offsets = offsets  # keys[i] の行番号は rows[offsets[i]:offsets[i + 1]]
+        self._rows = rows
+        # with_changes で作り直したN-gram -> 行番号（こちらを優先する）
+        self._overrides: Dict[int, np.ndarray] = overrides if overrides is not None else {}
+
+    @classmethod
+    def build(cls, terms: Sequence[ITTerm]) -> 'TermSearchIndex':
+        """用語リストから索引を構築"""
+        fields = [_fields(term) for term in terms]
+        if not fields:
+            return cls(fields, np.empty(0, dtype=np.int64), np.zeros(1, dtype=np.int64), _EMPTY)
+
+        # すべての項目を区切り文字でつないだ1つの文字コード列にし、各文字の行番号を並べる
+        texts = [text for row in fields for text in row]
+        data = _SEPARATOR.join(texts).encode("utf-32-le", "surrogatepass")
+        codes = np.frombuffer(data, dtype=np.uint32).astype(np.int64)
+        lengths = np.array([sum(len(text) for text in row) + len(row) for row in fields], dtype=np.int64)
+        lengths[-1] -= 1  # 最後の項目の後ろには区切り文字がない
+        row_of = np.repeat(np.arange(len(fields), dtype=np.int32), lengths)
+
+        # 位置 i から始まる長さ n のN-gramの値を n = 1, 2, 3 の順に計算し、区切り文字をまたぐものを除く
+        gram_keys = []
+        gram_rows = []
+        keys = codes
+        valid = codes != 0
+        for n in range(1, MAX_GRAM + 1):
+            if n > 1:
+                keys = (keys[:-1] << _CODE_BITS) | codes[n - 1:]
+                valid = valid[:-1] & (codes[n - 1:] != 0)
+            gram_keys.append(keys[valid])
+            gram_rows.append(row_of[:len(keys)][valid])
+        all_keys = np.concatenate(gram_keys)
+        all_rows = np.concatenate(gram_rows)
+
+        # N-gramの値で並べる。同じ値は同じnの範囲にしかないため、安定ソートなら行番号は昇順のまま
+        order = np.argsort(all_keys, kind="stable")
+        all_keys = all_keys[order]
+        all_rows = all_rows[order]
+        # 同じ行の同じN-gramは1つにまとめる
+        keep = np.ones(len(all_keys), dtype=bool)
+        keep[1:] = (all_keys[1:] != all_keys[:-1]) | (all_rows[1:] != all_rows[:-1])
+        all_keys = all_keys[keep]
+        all_rows = all_rows[keep]
+
+        starts = np.flatnonzero(np.r_[True, all_keys[1:] != all_keys[:-1]])
+        offsets = np.append(starts, len(all_keys))
+        return cls(fields, all_keys[starts], offsets, all_rows)
+
+    def with_changes(self, replaced: Dict[int, ITTerm], appended: Sequence[ITTerm]) -> 'TermSearchIndex':
+        """一部の行を差し替え・追加した新しい索引（変わったN-gramのポスティングだけを作り直す）"""
+        fields = list(self._fields)
+        added: Dict[int, List[int]] = {}
+        removed: Dict[int, List[int]] = {}
+
+        changes = list(replaced.items()) + [(len(fields) + i, term) for i, term in enumerate(appended)]
+        fields.extend(_fields(term) for term in appended)
+        for row, term in changes:
+            old = _gram_keys(self._fields[row]) if row < len(self._fields) else set()
+            fields[row] = _fields(term)
+            new = _gram_keys(fields[row])
+            for key in old - new:
+                removed.setdefault(key, []).append(row)
+            for key in new - old:
+                added.setdefault(key, []).append(row)
+
+        overrides = dict(self._overrides)
+        for key in added.keys() | removed.keys():
+            # ポスティングは昇順のため、二分探索の位置で削除・挿入すれば並びは保たれる
+            rows = self._postings(key)
+            if key in removed:
+                rows = np.delete(rows, np.searchsorted(rows, sorted(removed[key])))
+            if key in added:
+                inserted = sorted(added[key])
+                rows = np.insert(rows, np.searchsorted(rows, inserted), inserted)
+            overrides[key] = rows.astype(np.int32, copy=False)
+        return TermSearchIndex(fields, self._keys, self._offsets, self._rows, overrides)
+
+    def _postings(self, key: int) -> np.ndarray:
+        """N-gramを含む行番号（昇順）"""
+        rows = self._overrides.get(key)
+        if rows is not None:
+            return rows
+        i = int(np.searchsorted(self._keys, key))
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._rows[self._offsets[i]:self._offsets[i + 1]]
+        return _EMPTY
+
+    def _candidates(self, query: str) -> np.ndarray:
+        if len(query) <= MAX_GRAM:
+            return self._postings(_gram_key(query))
+
+        # 件数の少ないN-gramから積集合を取り、空になったら打ち切る
+        lists = sorted((self._postings(key) for key in _gram_keys([query], [MAX_GRAM])), key=len)
+        candidates = lists[0]
+        for rows in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+        return candidates
+
+    def find(self, query: str) -> Dict[int, int]:
+        """
+        検索語を部分文字列として含む行と、その順位を返す
+
+        Args:
+            query: 検索語（大文字小文字は区別しない）
+
+        Returns:
+            行番号 -> 順位（RANK_TERM, RANK_FULL_NAME, RANK_DESCRIPTION）
+        """
+        query = query.lower()
+        if not query:
+            return {row: RANK_TERM for row in range(len(self._fields))}
+        if _SEPARATOR in query:
+            return {}
+
+        matches: Dict[int, int] = {}
+        for row in self._candidates(query).tolist():
+            term, full_name, description = self._fields[row]
+            if query in term:
+                matches[row] = RANK_TERM
+            elif query in full_name:
+                matches[row] = RANK_FULL_NAME
+            elif query in description:
+                matches[row] = RANK_DESCRIPTION
+        return matches
+
+    def __len__(self) -> int:
+        return len(self._fields)
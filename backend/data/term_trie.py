@@ -0,0 +1,48 @@
+from typing import Any, Dict, Iterable, Tuple
+
+# 用語の終端を表すキー（1文字のキーと衝突しないよう空文字を使う）
+TERMINAL_KEY = ""
+
+
+class TermTrie:
+    """
+    大文字の用語から作るプレフィックス木
+
+    選択途中の文字列が「いずれかの用語の先頭部分か」「用語そのものか」をO(文字数)で判定する。
+    """
+
+    __slots__ = ("version", "root", "_serialized")
+
+    def __init__(self, words: Iterable[str], version: str):
+        self.version = version
+        self.root: Dict[str, Any] = {}
+        for word in words:
+            node = self.root
+            for char in word:
+                node = node.setdefault(char, {})
+            node[TERMINAL_KEY] = 1
+        self._serialized = None
+
+    def lookup(self, text: str) -> Tuple[bool, bool]:
+        """
+        文字列を判定
+
+        Returns:
+            Tuple[bool, bool]: (いずれかの用語の先頭部分か, 用語と完全に一致するか)
+        """
+        node = self.root
+        for char in text.upper():
+            node = node.get(char)
+            if node is None:
+                return False, False
+        return True, TERMINAL_KEY in node
+
+    def serialize(self) -> Dict[str, Any]:
+        """
+        クライアント配布用の入れ子辞書（各ノードは 文字 -> 子ノード、終端は "": 1）
+
+        辞書のバージョンごとに一度だけ作成する
+        """
+        if self._serialized is None:
+            self._serialized = {"version": self.version, "terminal_key": TERMINAL_KEY, "root": self.root}
+        return self._serialized
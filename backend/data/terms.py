@@ -1,8 +1,13 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from models import ITTerm
 from database.term_repository import TermRepository
+from database.circuit_breaker import CircuitBreaker
+from data.term_index import TermIndex, terms_digest
+from data.term_refresher import BackgroundRefresher
+from data.term_responses import term_response_cache
 from datetime import datetime, timedelta
 import logging
+import os
 import time
 import threading
 
@@ -12,13 +17,29 @@ logger = logging.getLogger(__name__)
 
 # リポジトリのインスタンス
 _term_repository = TermRepository()
+# データベース呼び出しのサーキットブレーカー（リクエスト中に接続確認や待機をしない）
+_db_breaker = CircuitBreaker("ITTermsデータベース")
 
 # メモリキャッシュ関連の変数
 _terms_cache: List[ITTerm] = []
 _cache_last_updated: Optional[datetime] = None
 _cache_ttl = timedelta(days=7)  # キャッシュの有効期間: 7日間に延長
+# テーブル全体を読み直す間隔（秒）。削除された用語はこの読み直しで反映される
+TERM_CACHE_REFRESH_INTERVAL = float(os.environ.get("TERM_CACHE_REFRESH_INTERVAL", "3600"))
+# 前回以降に更新された用語（updated_at）だけを読み込む間隔（秒）
+TERM_CACHE_SYNC_INTERVAL = float(os.environ.get("TERM_CACHE_SYNC_INTERVAL", "10"))
+# 差分の読み込みで前回の最大updated_atより前から読み直す秒数（コミットの遅れに備える）
+TERM_CACHE_SYNC_OVERLAP = float(os.environ.get("TERM_CACHE_SYNC_OVERLAP", "5"))
+# 失敗後の再試行までの最小の間隔（秒）
+TERM_CACHE_RETRY_DELAY = float(os.environ.get("TERM_CACHE_RETRY_DELAY", "30"))
 _initialization_lock = threading.Lock()  # 複数スレッドからの初期化を防ぐためのロック
 _is_initialized = False  # 初期化が完了したかどうかのフラグ
+_term_index = TermIndex.build([], version=0)  # キャッシュ更新ごとに作り直す用語索引
+_index_version = 0
+_index_lock = threading.Lock()
+_high_water_mark: Optional[datetime] = None  # 読み込み済みの行の最大updated_at（データベースの時刻）
+_last_synced: Optional[float] = None  # 最後にデータベースと同期した時刻（time.monotonic）
+_delta_stats = {"delta_syncs": 0, "delta_changes": 0}
 
 # 既存のバックアップデータ（略）
 _it_terms_backup = [
@@ -162,6 +183,66 @@ _it_terms_backup = [
 
 ]
 
+# バックアップデータの索引（キャッシュに見つからない場合に使う）
+_backup_index = TermIndex.build(_it_terms_backup, version=0)
+
+
+def _set_terms_cache(terms: List[ITTerm], refreshed: bool = True) -> bool:
+    """
+    キャッシュを差し替え、新しいバージョンの用語索引を構築
+
+    Args:
+        terms: 新しい用語リスト
+        refreshed: Trueの場合、キャッシュの更新時刻も更新する
+
+    Returns:
+        新しいバージョンに差し替えたか（内容が現在の索引と同じ場合は構築せずにFalse）
+    """
+    global _terms_cache, _cache_last_updated, _term_index, _index_version
+
+    index_terms = list(terms)
+    # 構築中のリクエストは前のバージョンを使う（ロックは更新どうしの順番だけを守る）
+    with _index_lock:
+        # 内容が変わっていなければ現在のバージョンを使い続ける（索引とレスポンスのキャッシュを作り直さない）
+        if _index_version > 0 and terms_digest(index_terms) == _term_index.digest:
+            if refreshed:
+                _cache_last_updated = datetime.now()
+            return False
+
+        index = TermIndex.build(index_terms, _index_version + 1)
+        # 一覧の並び順と検索索引は差し替える前に作成する
+        index.prepare_views()
+        _index_version += 1
+        _terms_cache = index_terms
+        _term_index = index
+        if refreshed:
+            _cache_last_updated = datetime.now()
+    term_response_cache.prepare(index)
+    return True
+
+
+def _apply_terms_delta(changed: List[ITTerm]) -> int:
+    """
+    追加・更新された用語を現在の索引に反映（変更のない部分は作り直さない）
+
+    Returns:
+        新しいバージョンに反映した用語の数（変化がなければ0でバージョンも変えない）
+    """
+    global _terms_cache, _term_index, _index_version
+
+    with _index_lock:
+        index = _term_index.with_changes(changed, _index_version + 1)
+        if index is _term_index:
+            return 0
+        changes = sum(1 for term in changed if _term_index.by_key.get(term.term.upper()) != term)
+        # 検索索引は変わった部分だけ作り直して引き継ぐため、並び順と単語セットカタログを作成して差し替える
+        index.prepare_views()
+        _index_version += 1
+        _terms_cache = list(index.terms)
+        _term_index = index
+    term_response_cache.prepare(index)
+    return changes
+
 
 def _is_cache_valid() -> bool:
     """キャッシュが有効かどうかを判定"""
@@ -170,77 +251,112 @@ def _is_cache_valid() -> bool:
     return datetime.now() - _cache_last_updated < _cache_ttl
 
 
-def _is_db_available() -> bool:
-    """データベース接続が利用可能かチェック"""
-    try:
-        # 軽量なクエリを実行して接続テスト
-        _term_repository.test_connection()
-        return True
-    except Exception as e:
-        logger.warning(f"データベース接続チェック失敗: {str(e)}")
-        return False
+def _update_cache(max_retries: int = 1, retry_delay: int = 2) -> bool:
+    """
+    キャッシュを更新
 
+    データベースの状態はサーキットブレーカーで判定し、遮断中は問い合わせずに諦める。
+    リクエストの処理中に呼ばれた場合は1回だけ試行し、待機しない。
 
-def _update_cache(max_retries: int = 3, retry_delay: int = 2) -> bool:
-    """
-    キャッシュを更新（リトライ機能付き）
-    
     Args:
-        max_retries: 最大リトライ回数
-        retry_delay: リトライ間隔（秒）
+        max_retries: 最大試行回数（2以上はリクエストを処理しないスクリプトからのみ指定する）
+        retry_delay: 再試行までの最小の待ち時間（秒）。遮断中はブレーカーの待ち時間に従う
     """
-    global _terms_cache, _cache_last_updated
-    
-    # DBが利用可能か先にチェック
-    if not _is_db_available():
-        logger.warning("データベースが利用できないため、キャッシュ更新をスキップします")
-        # キャッシュが空の場合のみバックアップデータを使用
-        if not _terms_cache:
-            logger.info("バックアップデータからキャッシュを初期化します")
-            _terms_cache = _it_terms_backup.copy()
-            _cache_last_updated = datetime.now()
-        return False
-    
-    # DB接続を試行（リトライあり）
-    retry_count = 0
     last_error = None
-    
-    while retry_count < max_retries:
+
+    for attempt in range(max_retries):
+        if attempt:
+            wait = max(retry_delay, _db_breaker.retry_after())
+            logger.info(f"{wait:.1f}秒後にリトライします...")
+            time.sleep(wait)
+
+        if not _db_breaker.allow_request():
+            # 遮断中はリクエストごとに呼ばれるため、ログは遮断・回復時にブレーカーが出す
+            continue
+
         try:
-            # データベースから全用語を取得
-            terms = _term_repository.get_all_terms()
-            if terms:
-                _terms_cache = terms
-                _cache_last_updated = datetime.now()
-                logger.info(f"IT用語キャッシュを更新しました。{len(terms)}件の用語を読み込みました。")
-                return True
-            else:
-                logger.warning("データベースから取得した用語が0件です")
-                retry_count += 1
+            # データベースから全用語を取得（以降の差分読み込みの基準になる最大updated_atも取得）
+            terms, high_water_mark = _term_repository.get_terms_updated_since(None)
         except Exception as e:
             last_error = e
-            logger.error(f"キャッシュ更新中にエラー ({retry_count+1}/{max_retries}): {str(e)}")
-            retry_count += 1
-            if retry_count < max_retries:
-                logger.info(f"{retry_delay}秒後にリトライします...")
-                time.sleep(retry_delay)
-    
-    # 全てのリトライが失敗した場合
-    logger.error(f"キャッシュ更新に失敗しました（{max_retries}回リトライ後）: {str(last_error)}")
-    
+            _db_breaker.record_failure(e)
+            logger.error(f"キャッシュ更新中にエラー ({attempt+1}/{max_retries}): {str(e)}")
+            continue
+
+        _db_breaker.record_success()
+        if terms:
+            changed = _set_terms_cache(terms)
+            _mark_synced(high_water_mark)
+            if changed:
+                logger.info(f"IT用語キャッシュを更新しました。{len(terms)}件の用語を読み込みました。")
+            else:
+                logger.info(f"IT用語に変更はありません（{len(terms)}件）。現在のバージョンを使い続けます。")
+            return True
+        logger.warning("データベースから取得した用語が0件です")
+
+    if last_error is not None:
+        logger.error(f"キャッシュ更新に失敗しました（{max_retries}回試行）: {str(last_error)}")
+
     # キャッシュが空の場合はバックアップデータで初期化
+    # 更新時刻は進めないため、ブレーカーが試行を許可したら再びデータベースから読み込む
     if not _terms_cache:
         logger.info("バックアップデータからキャッシュを初期化します")
-        _terms_cache = _it_terms_backup.copy()
-        _cache_last_updated = datetime.now()
-    
+        _set_terms_cache(_it_terms_backup, refreshed=False)
+
     return False
 
 
+def _mark_synced(high_water_mark: Optional[datetime]) -> None:
+    global _high_water_mark, _last_synced
+    if high_water_mark is not None and (_high_water_mark is None or high_water_mark > _high_water_mark):
+        _high_water_mark = high_water_mark
+    _last_synced = time.monotonic()
+
+
+def _sync_cache_delta() -> bool:
+    """
+    前回以降に追加・更新された用語だけを読み込んでキャッシュに反映
+
+    削除は検出できないため、TERM_CACHE_REFRESH_INTERVALごとの全件の読み直しで反映する。
+    基準のupdated_atがない場合（バックアップデータのみ・updated_atが空の行のみ）は全件を読み込む。
+    """
+    if _high_water_mark is None:
+        return _update_cache()
+    if not _db_breaker.allow_request():
+        return False
+
+    try:
+        changed, high_water_mark = _term_repository.get_terms_updated_since(
+            _high_water_mark - timedelta(seconds=TERM_CACHE_SYNC_OVERLAP))
+    except Exception as e:
+        _db_breaker.record_failure(e)
+        logger.error(f"キャッシュの差分更新中にエラー: {str(e)}")
+        return False
+
+    _db_breaker.record_success()
+    changes = _apply_terms_delta(changed) if changed else 0
+    _mark_synced(high_water_mark)
+    _delta_stats["delta_syncs"] += 1
+    if changes:
+        _delta_stats["delta_changes"] += changes
+        logger.info(f"IT用語キャッシュに{changes}件の追加・更新を反映しました")
+    return True
+
+
+def _refresh_cache() -> bool:
+    """バックグラウンド更新の1回分（全件の読み直しの時期なら全件、それ以外は差分）"""
+    if not _is_initialized or _cache_last_updated is None or \
+            (datetime.now() - _cache_last_updated).total_seconds() >= TERM_CACHE_REFRESH_INTERVAL:
+        return _update_cache()
+    return _sync_cache_delta()
+
+
 def initialize_cache(force: bool = False) -> bool:
     """
     キャッシュを初期化する（アプリケーション起動時に呼び出す）
-    
+
+    失敗してもその場では再試行しない（再試行はバックグラウンド更新が行う）
+
     Args:
         force: Trueの場合、キャッシュが有効でも強制的に再初期化
     """
@@ -249,22 +365,27 @@ def initialize_cache(force: bool = False) -> bool:
     with _initialization_lock:
         if force or not _is_initialized or not _is_cache_valid():
             logger.info("IT用語キャッシュを初期化しています...")
-            success = _update_cache(max_retries=5, retry_delay=3)
+            success = _update_cache()
             _is_initialized = True
             return success
         return True
 
 
 def get_terms() -> List[ITTerm]:
-    """すべてのIT用語を取得（キャッシュ対応）"""
+    """
+    すべてのIT用語を取得（キャッシュ対応）
+
+    バックグラウンド更新が動いている場合は、期限切れでも現在のキャッシュをそのまま返す
+    （更新はterm_cache_refresherが行い、リクエストの処理中にデータベースを待たない）
+    """
     global _is_initialized
     
     # 初期化されていない場合は初期化を試みる
     if not _is_initialized:
         initialize_cache()
     
-    # キャッシュが無効の場合に更新を試みる
-    if not _is_cache_valid():
+    # バックグラウンド更新が動いていない場合（スクリプトなど）だけ、その場で更新を試みる
+    if not _is_cache_valid() and not term_cache_refresher.running:
         _update_cache()
     
     # キャッシュが利用可能ならキャッシュを返す
@@ -272,67 +393,89 @@ def get_terms() -> List[ITTerm]:
         return _terms_cache
     
     # キャッシュもバックアップデータも利用できない場合は最後の手段としてDBに直接アクセス
-    try:
-        return _term_repository.get_all_terms()
-    except Exception as e:
-        logger.error(f"データベースアクセスエラー、バックアップデータを使用: {str(e)}")
-        return _it_terms_backup
+    if _db_breaker.allow_request():
+        try:
+            terms = _term_repository.get_all_terms()
+            _db_breaker.record_success()
+            return terms
+        except Exception as e:
+            _db_breaker.record_failure(e)
+            logger.error(f"データベースアクセスエラー、バックアップデータを使用: {str(e)}")
+    return _it_terms_backup
+
+
+def _seconds_until_refresh() -> float:
+    """次のバックグラウンド更新（全件または差分）までの秒数"""
+    if _cache_last_updated is None or _last_synced is None:
+        # まだデータベースから読み込めていない場合は、ブレーカーが試行を許可したらすぐに更新する
+        return _db_breaker.retry_after()
+    full_due = TERM_CACHE_REFRESH_INTERVAL - (datetime.now() - _cache_last_updated).total_seconds()
+    delta_due = TERM_CACHE_SYNC_INTERVAL - (time.monotonic() - _last_synced)
+    return min(full_due, delta_due)
+
+
+# キャッシュのバックグラウンド更新（アプリケーション起動時に開始する）
+term_cache_refresher = BackgroundRefresher(
+    "term-cache-refresh", _refresh_cache, _seconds_until_refresh, TERM_CACHE_RETRY_DELAY)
+
+
+def get_cache_stats() -> Dict[str, object]:
+    """
+    キャッシュの鮮度と更新の状態を取得
+
+    age_seconds は最後に全件を読み込んでからの秒数、sync_age_seconds は最後に（差分を含めて）
+    データベースと同期してからの秒数。
+    """
+    age = (datetime.now() - _cache_last_updated).total_seconds() if _cache_last_updated else None
+    return {
+        "version": _term_index.version,
+        "terms": len(_term_index),
+        "source": "database" if _cache_last_updated else "backup",
+        "age_seconds": age,
+        "sync_age_seconds": time.monotonic() - _last_synced if _last_synced is not None else None,
+        "high_water_mark": _high_water_mark.isoformat() if _high_water_mark else None,
+        "stale": not _is_cache_valid(),
+        **_delta_stats,
+        "refresher": term_cache_refresher.get_stats(),
+    }
+
+
+def get_db_health() -> Dict[str, object]:
+    """データベース接続の状態（サーキットブレーカーの判定）を取得"""
+    return _db_breaker.get_stats()
+
+
+def get_term_index() -> TermIndex:
+    """現在のバージョンの用語索引を取得（キャッシュ対応）"""
+    # 初期化・有効期限の確認はget_termsと同じ
+    get_terms()
+    return _term_index
 
 
 def find_term(term_str: str) -> Optional[ITTerm]:
-    """指定された文字列に一致する用語を検索（キャッシュ対応）"""
-    global _is_initialized
-    
-    # 初期化されていない場合は初期化を試みる
-    if not _is_initialized:
-        initialize_cache()
-    
-    # キャッシュが無効の場合に更新を試みる
-    if not _is_cache_valid():
-        _update_cache()
-    
-    # キャッシュから検索
-    term_upper = term_str.upper()
-    
-    # キャッシュが利用可能ならキャッシュから検索
-    if _terms_cache:
-        for term in _terms_cache:
-            if term.term.upper() == term_upper:
-                return term
-    
-    # キャッシュにない場合はDBを直接検索
-    if _is_db_available():
-        try:
-            term = _term_repository.find_term_by_name(term_str)
-            if term:
-                return term
-        except Exception as e:
-            logger.error(f"データベース検索エラー: {str(e)}")
-    
+    """
+    指定された文字列に一致する用語を検索（キャッシュ対応）
+
+    用語索引とバックアップデータのハッシュ検索のみで判定し、データベースには問い合わせない
+    （キャッシュはITTermsテーブル全体を保持しているため、キャッシュにない用語はDBにもない）
+    """
+    term = get_term_index().lookup(term_str)
+    if term:
+        return term
+
     # バックアップデータから検索
-    for term in _it_terms_backup:
-        if term.term.upper() == term_upper:
-            return term
-    
-    return None
+    return _backup_index.by_key.get(term_str.upper())
 
 
 def add_term(term: ITTerm) -> bool:
     """新しい用語を追加（キャッシュも更新）"""
     success = _term_repository.add_term(term)
     if success:
-        # キャッシュに新しい用語を追加
-        global _terms_cache
+        # キャッシュに新しい用語を追加（索引は作り直さずに差分だけ反映）
         if _terms_cache:
             # すでに同じ用語が存在しないか確認
-            exists = False
-            for cached_term in _terms_cache:
-                if cached_term.term.upper() == term.term.upper():
-                    exists = True
-                    break
-            
-            if not exists:
-                _terms_cache.append(term)
+            if term.term.upper() not in _term_index.by_key:
+                _apply_terms_delta([term])
                 logger.info(f"キャッシュに新しい用語を追加: {term.term}")
     return success
 
@@ -0,0 +1,118 @@
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 連続して何回失敗したら遮断するか
+DB_BREAKER_FAILURE_THRESHOLD = int(os.environ.get("DB_BREAKER_FAILURE_THRESHOLD", "3"))
+# 遮断してから再試行するまでの待ち時間（秒）。遮断が続くたびに倍にし、上限で止める
+DB_BREAKER_BASE_DELAY = float(os.environ.get("DB_BREAKER_BASE_DELAY", "2"))
+DB_BREAKER_MAX_DELAY = float(os.environ.get("DB_BREAKER_MAX_DELAY", "300"))
+
+# 状態
+STATE_CLOSED = "closed"  # 通常（呼び出しを許可）
+STATE_OPEN = "open"  # 遮断中（呼び出さずに即座に失敗扱い）
+STATE_HALF_OPEN = "half_open"  # 待ち時間が過ぎたあとの試行中（1つの呼び出しだけ許可）
+
+
+class CircuitBreaker:
+    """
+    外部依存（データベース）の呼び出しを守るサーキットブレーカー
+
+    連続失敗が閾値に達すると遮断し、指数バックオフ（ジッター付き）の待ち時間が過ぎるまで呼び出しを許可しない。
+    待ち時間が過ぎたら1つの呼び出しだけを試行として許可し、成功すれば通常に戻り、失敗すれば待ち時間を延ばして再び遮断する。
+    状態の判定は時刻の比較だけで、接続確認のクエリや待機（sleep）は行わない。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = DB_BREAKER_FAILURE_THRESHOLD,
+                 base_delay: float = DB_BREAKER_BASE_DELAY, max_delay: float = DB_BREAKER_MAX_DELAY):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._state = STATE_CLOSED
+        self._failures = 0  # 連続失敗数
+        self._opened_count = 0  # 通常に戻るまでに遮断した回数（バックオフの指数）
+        self._retry_at = 0.0  # 次に試行を許可する時刻（time.monotonic）
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+        # 統計情報
+        self._rejected = 0
+        self._last_error: Optional[str] = None
+        self._last_success: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def available(self) -> bool:
+        """キャッシュ済みの判定: 遮断されていないか（待ち時間が過ぎていれば試行可能として扱う）"""
+        return self._state != STATE_OPEN or time.monotonic() >= self._retry_at
+
+    def allow_request(self) -> bool:
+        """呼び出してよいか（Trueを返した場合は必ず record_success か record_failure を呼ぶ）"""
+        with self._lock:
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_OPEN and time.monotonic() >= self._retry_at:
+                self._state = STATE_HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == STATE_HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """呼び出しの成功を記録（通常に戻す）"""
+        with self._lock:
+            if self._state != STATE_CLOSED:
+                logger.info(f"{self.name}: 接続が回復しました")
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._opened_count = 0
+            self._trial_in_flight = False
+            self._last_success = time.time()
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        """呼び出しの失敗を記録（閾値に達した、または試行中の失敗なら遮断する）"""
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error) if error is not None else None
+            if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self) -> None:
+        # 待ち時間は base * 2^(遮断回数) を上限で切り、半分から全体の間でランダムにずらす
+        delay = min(self.max_delay, self.base_delay * (2 ** self._opened_count))
+        delay = random.uniform(delay / 2, delay)
+        self._opened_count += 1
+        self._state = STATE_OPEN
+        self._trial_in_flight = False
+        self._retry_at = time.monotonic() + delay
+        logger.warning(f"{self.name}: 呼び出しを{delay:.1f}秒間遮断します（連続失敗 {self._failures}回）")
+
+    def retry_after(self) -> float:
+        """次に試行できるまでの秒数（遮断中でなければ0）"""
+        if self._state != STATE_OPEN:
+            return 0.0
+        return max(0.0, self._retry_at - time.monotonic())
+
+    def get_stats(self) -> Dict[str, object]:
+        """状態と統計情報を取得"""
+        return {
+            "state": self._state,
+            "available": self.available,
+            "consecutive_failures": self._failures,
+            "retry_after_seconds": self.retry_after(),
+            "rejected": self._rejected,
+            "last_error": self._last_error,
+            "last_success": self._last_success,
+        }
@@ -1,5 +1,6 @@
 import logging
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Tuple
 from models import ITTerm
 from database.db_manager import DBManager
 
@@ -45,31 +46,45 @@ class TermRepository:
             # 呼び出し側で適切に処理できるようにする
             raise
     
-    def find_term_by_name(self, term_str: str) -> Optional[ITTerm]:
-        """指定された文字列に一致する用語を検索"""
+    def get_terms_updated_since(self, since: Optional[datetime]) -> Tuple[List[ITTerm], Optional[datetime]]:
+        """
+        updated_at が since より新しいIT用語を更新日時の順に取得（sinceがNoneの場合はすべてを登録順に取得）
+
+        Returns:
+            Tuple[List[ITTerm], Optional[datetime]]: (用語のリスト, 取得した行の最大のupdated_at)
+        """
+        terms = []
+        high_water_mark = None
+
         try:
             with self.db_manager.get_connection() as conn:
                 cursor = conn.cursor()
-                # パラメータ化クエリでSQLインジェクションを防止
-                cursor.execute(
-                    "SELECT term, fullName, description, difficulty FROM ITTerms WHERE UPPER(term) = UPPER(?)",
-                    term_str
-                )
-                
-                row = cursor.fetchone()
-                if row:
-                    return ITTerm(
+                if since is None:
+                    cursor.execute(
+                        "SELECT term, fullName, description, difficulty, updated_at FROM ITTerms ORDER BY id"
+                    )
+                else:
+                    cursor.execute(
+                        "SELECT term, fullName, description, difficulty, updated_at FROM ITTerms "
+                        "WHERE updated_at > ? ORDER BY updated_at, id",
+                        since
+                    )
+
+                for row in cursor.fetchall():
+                    terms.append(ITTerm(
                         term=row[0],
                         fullName=row[1],
                         description=row[2],
                         difficulty=row[3]
-                    )
-                
-                return None
+                    ))
+                    if row[4] is not None and (high_water_mark is None or row[4] > high_water_mark):
+                        high_water_mark = row[4]
+
+                return terms, high_water_mark
         except Exception as e:
-            logging.error(f"Error finding term {term_str}: {str(e)}")
+            logging.error(f"Error getting updated terms: {str(e)}")
             raise
-    
+
     def add_term(self, term: ITTerm) -> bool:
         """新しい用語を追加"""
         try:
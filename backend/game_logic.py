@@ -1,18 +1,220 @@
+import os
 import random
 import string
-import math
-from typing import List, Dict, Tuple
-from models import ITTerm
+import threading
+import time
+from collections import ChainMap
+from functools import lru_cache
+from typing import Callable, List, Dict, Mapping, NamedTuple, Optional, Tuple
+from models import GRID_SIZE, ITTerm
 
+# グリッドのセル数
+GRID_CELLS = GRID_SIZE * GRID_SIZE
 
-def generate_game_grid(terms: List[ITTerm], debug: bool = False) -> List[List[str]]:
+# 配置方向ごとの (行の増分, 列の増分)
+DIRECTION_STEPS = {
+    'horizontal': (0, 1),
+    'vertical': (1, 0),
+    'diagonal': (1, 1),
+    'reverse_diagonal': (1, -1),
+}
+
+# グリッド生成アルゴリズムのバージョン（シードから同じグリッドを再現できる範囲）
+# 生成結果が変わる変更を加えた場合は必ず上げること
+GRID_ALGORITHM_VERSION = 1
+
+# 全消しレイアウト探索の予算（CPU秒・探索ノード数）
+# ノード数の上限は生成結果に影響するため定数とし、変更する場合は GRID_ALGORITHM_VERSION も上げる
+GRID_SOLVER_TIME_BUDGET = float(os.environ.get("GRID_SOLVER_TIME_BUDGET", "0.02"))
+GRID_SOLVER_MAX_NODES = 10000
+
+# レイアウト探索の結果集計
+_solver_stats = {"solved": 0, "infeasible": 0, "timeout": 0}
+_solver_stats_lock = threading.Lock()
+
+
+class LineSegment(NamedTuple):
+    """グリッド上の直線セグメント（セルインデックスは row * GRID_SIZE + col）"""
+    direction: str
+    mask: int  # 25ビットの占有マスク
+    cells: Tuple[int, ...]
+
+
+def _build_line_segments() -> Dict[int, Dict[str, List[LineSegment]]]:
+    """長さ1〜5のすべての直線セグメントを方向ごとに列挙する"""
+    segments: Dict[int, Dict[str, List[LineSegment]]] = {}
+    for length in range(1, GRID_SIZE + 1):
+        segments[length] = {}
+        for direction, (d_row, d_col) in DIRECTION_STEPS.items():
+            segments[length][direction] = []
+            for row in range(GRID_SIZE):
+                for col in range(GRID_SIZE):
+                    end_row = row + d_row * (length - 1)
+                    end_col = col + d_col * (length - 1)
+                    if not (0 <= end_row < GRID_SIZE and 0 <= end_col < GRID_SIZE):
+                        continue
+                    cells = tuple(
+                        (row + d_row * i) * GRID_SIZE + (col + d_col * i)
+                        for i in range(length)
+                    )
+                    mask = 0
+                    for cell in cells:
+                        mask |= 1 << cell
+                    segments[length][direction].append(
+                        LineSegment(direction, mask, cells))
+    return segments
+
+
+# モジュール読み込み時に一度だけ計算する
+LINE_SEGMENTS = _build_line_segments()
+
+
+def _build_straight_paths() -> Dict[Tuple[int, ...], int]:
+    """プレイヤーが選択できる直線パス（逆方向を含む）とそのセルマスク"""
+    paths: Dict[Tuple[int, ...], int] = {}
+    for by_direction in LINE_SEGMENTS.values():
+        for segments in by_direction.values():
+            for segment in segments:
+                paths[segment.cells] = segment.mask
+                paths[segment.cells[::-1]] = segment.mask
+    return paths
+
+
+STRAIGHT_PATHS = _build_straight_paths()
+
+
+class PlacementCandidate(NamedTuple):
+    """単語とセグメントの組み合わせ（文字ごとの必要セルマスク付き）"""
+    word: str
+    segment: LineSegment
+    letter_masks: Tuple[Tuple[str, int], ...]  # (文字, その文字が必要なセルのマスク)
+
+    @classmethod
+    def create(cls, word: str, segment: LineSegment) -> 'PlacementCandidate':
+        masks: Dict[str, int] = {}
+        for char, cell in zip(word, segment.cells):
+            masks[char] = masks.get(char, 0) | (1 << cell)
+        return cls(word, segment, tuple(masks.items()))
+
+
+@lru_cache(maxsize=4096)
+def _word_candidates(word: str) -> Dict[str, Tuple[PlacementCandidate, ...]]:
+    """単語ごとの配置候補（空のグリッド基準）をキャッシュ"""
+    return {
+        direction: tuple(PlacementCandidate.create(word, segment) for segment in segments)
+        for direction, segments in LINE_SEGMENTS[len(word)].items()
+    }
+
+
+class LayoutResult(NamedTuple):
+    """全消しレイアウト探索の結果"""
+    status: str  # "solved", "infeasible", "timeout"
+    placements: List[PlacementCandidate]
+
+
+class WordIndex:
+    """
+    グリッド上の直線パスで読めるすべての用語の索引（埋め草の文字で偶然できた用語も含む）
+
+    グリッド生成時に一度だけ作成し、選択の検証はパスのハッシュ検索で済ませる。
+    直線以外の選択も索引を作ったときと同じ辞書で検索するため、判定の基準は選択の形によらない。
+    """
+
+    __slots__ = ("paths", "dictionary")
+
+    def __init__(self, paths: Dict[Tuple[int, ...], ITTerm], dictionary: Mapping[str, ITTerm]):
+        self.paths = paths  # セルパス -> 用語
+        self.dictionary = dictionary  # 大文字の単語 -> 用語（索引の作成に使った辞書）
+
+    @classmethod
+    def build(cls, grid: List[List[str]], dictionary: Mapping[str, ITTerm]) -> 'WordIndex':
+        """グリッドのすべての直線パスを辞書と照合して索引を作成"""
+        cells = [char for row in grid for char in row]
+        paths: Dict[Tuple[int, ...], ITTerm] = {}
+        for path in STRAIGHT_PATHS:
+            term = dictionary.get("".join(cells[cell] for cell in path).upper())
+            if term is not None:
+                paths[path] = term
+        return cls(paths, dictionary)
+
+    def covers(self, path: Tuple[int, ...], cleared_mask: int) -> bool:
+        """このパスの判定を索引だけで確定できるか（消去済みセルを含まない直線パス）"""
+        mask = STRAIGHT_PATHS.get(path)
+        return mask is not None and not mask & cleared_mask
+
+    def find(self, path: Tuple[int, ...]) -> Optional[ITTerm]:
+        """パスで読める用語"""
+        return self.paths.get(path)
+
+    def lookup(self, word: str) -> Optional[ITTerm]:
+        """大文字の文字列に一致する用語（索引にないパスの選択用）"""
+        return self.dictionary.get(word)
+
+    def count_remaining(self, cleared_mask: int) -> int:
+        """消去済みセルを含まない、まだ見つけられる用語パスの数"""
+        # 同じセルを逆向きに読める場合も1つと数える
+        return len({STRAIGHT_PATHS[path] for path in self.paths
+                    if not STRAIGHT_PATHS[path] & cleared_mask})
+
+
+class Board(NamedTuple):
+    """シードから生成したグリッドと、その用語索引"""
+    seed: int
+    grid: List[List[str]]
+    word_index: WordIndex
+    cells: bytes  # グリッドを行優先に並べた25バイト（セッションに保存する形式）
+
+
+class GridBuilder:
+    """占有セルと文字ごとのセルをビットマスクで管理するグリッド構築器"""
+
+    __slots__ = ("cells", "occupied", "letter_masks")
+
+    def __init__(self):
+        self.cells: List[str] = [''] * GRID_CELLS
+        self.occupied = 0
+        self.letter_masks: Dict[str, int] = {}
+
+    def fits(self, candidate: PlacementCandidate) -> bool:
+        """既に置かれた文字と矛盾せずに配置できるか"""
+        conflicts = candidate.segment.mask & self.occupied
+        if not conflicts:
+            return True
+        for char, mask in candidate.letter_masks:
+            conflicts &= ~(mask & self.letter_masks.get(char, 0))
+        return not conflicts
+
+    def count_new_cells(self, segment: LineSegment) -> int:
+        """配置した場合に新しく使用するセル数"""
+        return (segment.mask & ~self.occupied).bit_count()
+
+    def place(self, candidate: PlacementCandidate) -> int:
+        """単語を配置し、新しく使用したセルのマスクを返す"""
+        new_mask = candidate.segment.mask & ~self.occupied
+        for char, cell in zip(candidate.word, candidate.segment.cells):
+            self.cells[cell] = char
+        for char, mask in candidate.letter_masks:
+            self.letter_masks[char] = self.letter_masks.get(char, 0) | mask
+        self.occupied |= candidate.segment.mask
+        return new_mask
+
+    def to_grid(self, filler: Callable[[], str]) -> List[List[str]]:
+        """空白セルをfillerで埋めて2次元グリッドに変換"""
+        cells = [cell or filler() for cell in self.cells]
+        return [cells[row * GRID_SIZE:(row + 1) * GRID_SIZE] for row in range(GRID_SIZE)]
+
+
+def generate_game_grid(terms: List[ITTerm], debug: bool = False,
+                       seed: Optional[int] = None) -> List[List[str]]:
     """
     用語をグリッドに配置し、5x5のグリッドを生成
-    全消しが可能なレイアウトを目指す
+    全消しが可能なレイアウトを探索し、予算内に見つからない場合は貪欲配置にフォールバックする
 
     Args:
         terms: 配置する用語のリスト
         debug: Trueの場合、デバッグ用の単純なグリッドを生成
+        seed: 乱数シード。指定した場合は (seed, 単語, GRID_ALGORITHM_VERSION) が同じなら同じグリッドを返す
+              （探索がCPU時間の締め切りで打ち切られた場合を除く。セッションは生成したグリッドそのものを保存する）
     """
     # デバッグモードの場合は単純なグリッドを作成
     if debug:
@@ -30,178 +232,292 @@ def generate_game_grid(terms: List[ITTerm], debug: bool = False) -> List[List[st
 
         return grid
 
-    # 通常モード - 最適化版
-    # 5x5のグリッドを生成
-    grid = [['' for _ in range(5)] for _ in range(5)]
-    
-    # 使用済みセルを追跡
-    used_cells = set()
-    
-    # 単語の配置方向をシャッフル
-    directions = ['horizontal', 'vertical', 'diagonal', 'reverse_diagonal']
-    
-    # 各単語について複数回配置を試みる
+    # 通常モード
+    # termの値を大文字に変換してグリッドに配置する（5文字を超える単語は配置不可）
+    words = []
     for term in terms:
-        # termの値を大文字に変換してグリッドに配置するために一時変数に保存
         uppercase_term = term.term.upper()
-        random.shuffle(directions)
-        placed = False
-        
-        # 各方向で配置を試みる
-        for direction in directions:
-            if placed:
-                break
-                
-            # 最大試行回数
-            max_attempts = 30
-            attempt = 0
-            
-            while not placed and attempt < max_attempts:
-                attempt += 1
-                
-                # 現在の使用済みセル数
-                current_usage = len(used_cells)
-                
-                # 単語を配置する可能なすべての位置を取得
-                possible_positions = []
-                
-                if direction == 'horizontal' and len(uppercase_term) <= 5:
-                    for row in range(5):
-                        for col in range(6 - len(uppercase_term)):
-                            can_place = True
-                            new_cells = []
-                            
-                            for i, char in enumerate(uppercase_term):
-                                cell_pos = (row, col + i)
-                                # グリッドの文字も大文字として比較
-                                if grid[row][col + i] != '' and grid[row][col + i] != char:
-                                    can_place = False
-                                    break
-                                
-                                if grid[row][col + i] == '':
-                                    new_cells.append(cell_pos)
-                            
-                            if can_place:
-                                # 新しく使用するセル数と位置を記録
-                                possible_positions.append({
-                                    'row': row,
-                                    'col': col,
-                                    'new_cells': new_cells,
-                                    'cell_count': len(new_cells)
-                                })
-                
-                elif direction == 'vertical' and len(uppercase_term) <= 5:
-                    # 縦方向の配置ロジック（横と同様）
-                    for row in range(6 - len(uppercase_term)):
-                        for col in range(5):
-                            can_place = True
-                            new_cells = []
-                            
-                            for i, char in enumerate(uppercase_term):
-                                cell_pos = (row + i, col)
-                                if grid[row + i][col] != '' and grid[row + i][col] != char:
-                                    can_place = False
-                                    break
-                                
-                                if grid[row + i][col] == '':
-                                    new_cells.append(cell_pos)
-                            
-                            if can_place:
-                                possible_positions.append({
-                                    'row': row,
-                                    'col': col,
-                                    'new_cells': new_cells,
-                                    'cell_count': len(new_cells)
-                                })
-                
-                # 対角線方向の配置も追加（オプション）
-                elif direction == 'diagonal' and len(uppercase_term) <= 5:
-                    for row in range(6 - len(uppercase_term)):
-                        for col in range(6 - len(uppercase_term)):
-                            can_place = True
-                            new_cells = []
-                            
-                            for i, char in enumerate(uppercase_term):
-                                cell_pos = (row + i, col + i)
-                                if grid[row + i][col + i] != '' and grid[row + i][col + i] != char:
-                                    can_place = False
-                                    break
-                                
-                                if grid[row + i][col + i] == '':
-                                    new_cells.append(cell_pos)
-                            
-                            if can_place:
-                                possible_positions.append({
-                                    'row': row,
-                                    'col': col,
-                                    'new_cells': new_cells,
-                                    'cell_count': len(new_cells)
-                                })
-                
-                elif direction == 'reverse_diagonal' and len(uppercase_term) <= 5:
-                    for row in range(6 - len(uppercase_term)):
-                        for col in range(len(uppercase_term) - 1, 5):
-                            can_place = True
-                            new_cells = []
-                            
-                            for i, char in enumerate(uppercase_term):
-                                cell_pos = (row + i, col - i)
-                                if grid[row + i][col - i] != '' and grid[row + i][col - i] != char:
-                                    can_place = False
-                                    break
-                                
-                                if grid[row + i][col - i] == '':
-                                    new_cells.append(cell_pos)
-                            
-                            if can_place:
-                                possible_positions.append({
-                                    'row': row,
-                                    'col': col,
-                                    'new_cells': new_cells,
-                                    'cell_count': len(new_cells)
-                                })
-                
-                # 可能な位置がある場合
-                if possible_positions:
-                    # 優先度：1. 新しいセル数が最大のもの、2. ランダム
-                    possible_positions.sort(key=lambda p: p['cell_count'], reverse=True)
-                    max_new_cells = possible_positions[0]['cell_count']
-                    best_positions = [p for p in possible_positions if p['cell_count'] == max_new_cells]
-                    position = random.choice(best_positions)
-                    
-                    # 選択した位置に単語を配置
-                    if direction == 'horizontal':
-                        row, col = position['row'], position['col']
-                        for i, char in enumerate(uppercase_term):
-                            grid[row][col + i] = char
-                            used_cells.add((row, col + i))
-                        placed = True
-                    elif direction == 'vertical':
-                        row, col = position['row'], position['col']
-                        for i, char in enumerate(uppercase_term):
-                            grid[row + i][col] = char
-                            used_cells.add((row + i, col))
-                        placed = True
-                    elif direction == 'diagonal':
-                        row, col = position['row'], position['col']
-                        for i, char in enumerate(uppercase_term):
-                            grid[row + i][col + i] = char
-                            used_cells.add((row + i, col + i))
-                        placed = True
-                    elif direction == 'reverse_diagonal':
-                        row, col = position['row'], position['col']
-                        for i, char in enumerate(uppercase_term):
-                            grid[row + i][col - i] = char
-                            used_cells.add((row + i, col - i))
-                        placed = True
-    
+        if 0 < len(uppercase_term) <= GRID_SIZE and uppercase_term not in words:
+            words.append(uppercase_term)
+
+    rng = random.Random() if seed is None else make_grid_rng(seed, words)
+
+    # まず全消し可能なレイアウトを探索し、見つからなければ貪欲配置にフォールバック
+    layout = solve_full_clear_layout(words, rng=rng)
+    _record_solver_result(layout.status)
+
+    if layout.status == "solved":
+        builder = GridBuilder()
+        for placement in layout.placements:
+            builder.place(placement)
+    else:
+        builder = _place_words_greedily(words, rng)
+
     # 空白を埋める部分
-    for i in range(5):
-        for j in range(5):
-            if grid[i][j] == '':
-                grid[i][j] = random.choice(string.ascii_uppercase)
+    return builder.to_grid(lambda: rng.choice(string.ascii_uppercase))
+
+
+def build_board(terms: List[ITTerm], dictionary: Mapping[str, ITTerm], debug: bool = False,
+                seed: Optional[int] = None) -> Board:
+    """
+    シードからグリッドを生成し、用語索引と合わせたBoardを作成
+
+    Args:
+        terms: 配置する用語のリスト
+        dictionary: 大文字の用語をキーにした用語辞書
+        debug: Trueの場合、デバッグ用の単純なグリッドを生成
+        seed: 乱数シード（省略時は新しく生成）
+    """
+    seed = new_grid_seed() if seed is None else seed
+    grid = generate_game_grid(terms, debug, seed)
+    return restore_board(seed, pack_grid(grid), terms, dictionary)
 
-    return grid
+
+def restore_board(seed: int, cells: bytes, terms: List[ITTerm], dictionary: Mapping[str, ITTerm]) -> Board:
+    """
+    保存した25バイトのグリッドからBoardを作成（グリッドは生成し直さない）
+
+    Args:
+        seed: グリッドのシード
+        cells: 行優先に並べた25バイトのグリッド
+        terms: 配置した用語のリスト
+        dictionary: 大文字の用語をキーにした用語辞書
+    """
+    grid = unpack_grid(cells)
+    # 配置対象の用語は辞書になくても（デバッグ用の単語など）見つけられるようにする
+    own_terms = {term.term.upper(): term for term in terms}
+    return Board(seed, grid, WordIndex.build(grid, ChainMap(own_terms, dictionary)), cells)
+
+
+def new_grid_seed() -> int:
+    """新しいグリッド用の乱数シードを生成"""
+    return random.getrandbits(63)
+
+
+def make_grid_rng(seed: int, words: List[str]) -> random.Random:
+    """シード・単語・アルゴリズムのバージョンから決定的な乱数生成器を作成"""
+    return random.Random(f"{GRID_ALGORITHM_VERSION}:{seed}:{','.join(words)}")
+
+
+def _place_words_greedily(words: List[str], rng: random.Random) -> GridBuilder:
+    """新しく使用するセル数が最大になる位置へ単語を順に配置する（フォールバック用）"""
+    builder = GridBuilder()
+
+    # 各単語の配置候補（方向ごと）を事前計算済みセグメントから作成
+    # 空のグリッドでは同じ長さのセグメントすべてが候補になる
+    pending = [
+        {direction: list(candidates) for direction, candidates in _word_candidates(word).items()}
+        for word in words
+    ]
+
+    directions = list(DIRECTION_STEPS)
+
+    for index, candidates in enumerate(pending):
+        # 単語の配置方向をシャッフル
+        rng.shuffle(directions)
+
+        for direction in directions:
+            # 配置可能な候補の中から新しく使用するセル数が最大のものを選ぶ
+            best_positions = []
+            max_new_cells = -1
+            for candidate in candidates[direction]:
+                new_cells = builder.count_new_cells(candidate.segment)
+                if new_cells > max_new_cells:
+                    max_new_cells = new_cells
+                    best_positions = [candidate]
+                elif new_cells == max_new_cells:
+                    best_positions.append(candidate)
+
+            if not best_positions:
+                continue
+
+            placed_mask = builder.place(rng.choice(best_positions))
+
+            # 配置したセルと重なる候補だけを再検証して候補集合を差分更新
+            for remaining in pending[index + 1:]:
+                for remaining_direction, remaining_candidates in remaining.items():
+                    remaining[remaining_direction] = [
+                        c for c in remaining_candidates
+                        if not c.segment.mask & placed_mask or builder.fits(c)
+                    ]
+            break
+
+    return builder
+
+
+class _SolverTimeout(Exception):
+    """探索がCPU予算を使い切った"""
+
+
+class _SolverRestart(Exception):
+    """1回の試行のノード上限に達した"""
+
+
+def _reachable_sums(lengths: List[int], limit: int) -> List[bool]:
+    """lengthsを任意回数使って作れる合計値（0〜limit）"""
+    reachable = [False] * (limit + 1)
+    reachable[0] = True
+    for total in range(1, limit + 1):
+        reachable[total] = any(
+            length <= total and reachable[total - length] for length in lengths)
+    return reachable
+
+
+def solve_full_clear_layout(words: List[str], rng: Optional[random.Random] = None,
+                            time_budget: Optional[float] = None,
+                            max_nodes: Optional[int] = None) -> LayoutResult:
+    """
+    すべての単語を1回以上使い、互いに重ならない直線配置で25マスを埋め尽くすレイアウトを探索する
+
+    一番小さい空きセルから始まるセグメントだけを分岐させるバックトラッキング（Algorithm X相当）で、
+    どの単語でも埋められないセルが出た時点で枝刈りする。
+
+    Args:
+        words: 大文字に変換済みの単語リスト（重複なし、5文字以下）
+        rng: 候補の並び替えに使う乱数生成器
+        time_budget: 探索に使えるCPU時間（秒）。Noneの場合はGRID_SOLVER_TIME_BUDGET
+        max_nodes: 探索ノード数の上限。Noneの場合はGRID_SOLVER_MAX_NODES
+
+    Returns:
+        LayoutResult: statusは "solved"（全消し可能）, "infeasible"（不可能と証明）, "timeout"（予算切れ）
+    """
+    if not words:
+        return LayoutResult("infeasible", [])
+
+    # 各単語を1回ずつ使った残りを、単語の長さの組み合わせで作れるか（長さだけで判定できる不可能ケース）
+    reachable = _reachable_sums(sorted({len(word) for word in words}), GRID_CELLS)
+    base_total = sum(len(word) for word in words)
+    if base_total > GRID_CELLS or not reachable[GRID_CELLS - base_total]:
+        return LayoutResult("infeasible", [])
+
+    rng = rng or random.Random()
+    time_budget = GRID_SOLVER_TIME_BUDGET if time_budget is None else time_budget
+    max_nodes = GRID_SOLVER_MAX_NODES if max_nodes is None else max_nodes
+    deadline = time.thread_time() + time_budget
+
+    # 開始セルごとの配置候補（セグメントの先頭セルは常にインデックス最小のセル）
+    options_by_cell: List[List[PlacementCandidate]] = [[] for _ in range(GRID_CELLS)]
+    for word in words:
+        for candidates in _word_candidates(word).values():
+            for candidate in candidates:
+                options_by_cell[candidate.segment.cells[0]].append(candidate)
+
+    full_mask = (1 << GRID_CELLS) - 1
+    use_counts = {word: 0 for word in words}
+    placements: List[PlacementCandidate] = []
+    total_nodes = 0
+    attempt_nodes = 0
+    attempt_limit = 0
+
+    def search(covered: int, remaining: int, unused_total: int) -> bool:
+        nonlocal attempt_nodes
+        if covered == full_mask:
+            return unused_total == 0
+
+        attempt_nodes += 1
+        if attempt_nodes > attempt_limit:
+            raise _SolverRestart()
+        if attempt_nodes & 63 == 0 and time.thread_time() > deadline:
+            raise _SolverTimeout()
+
+        # 未使用単語を配置したうえで残りを埋められない場合は枝刈り
+        if unused_total > remaining or not reachable[remaining - unused_total]:
+            return False
+
+        # 一番小さい空きセル
+        cell = (~covered & (covered + 1)).bit_length() - 1
+        options = [c for c in options_by_cell[cell] if not c.segment.mask & covered]
+        rng.shuffle(options)
+        # 未使用の単語を優先して試す
+        options.sort(key=lambda c: use_counts[c.word] > 0)
+
+        for candidate in options:
+            word = candidate.word
+            first_use = use_counts[word] == 0
+            use_counts[word] += 1
+            placements.append(candidate)
+            if search(covered | candidate.segment.mask, remaining - len(word),
+                      unused_total - len(word) if first_use else unused_total):
+                return True
+            placements.pop()
+            use_counts[word] -= 1
+        return False
+
+    # 探索時間のばらつきが大きいため、ノード上限を倍々にしながらランダムリスタートする
+    # 上限に達せずに探索し尽くした場合は配置不可能と証明できる
+    attempt_limit = 256
+    while total_nodes < max_nodes:
+        attempt_limit = min(attempt_limit, max_nodes - total_nodes)
+        attempt_nodes = 0
+        placements.clear()
+        for word in use_counts:
+            use_counts[word] = 0
+        try:
+            if search(0, GRID_CELLS, base_total):
+                return LayoutResult("solved", list(placements))
+            return LayoutResult("infeasible", [])
+        except _SolverRestart:
+            total_nodes += attempt_nodes
+            attempt_limit *= 2
+        except _SolverTimeout:
+            break
+    return LayoutResult("timeout", [])
+
+
+class LayoutCheck(NamedTuple):
+    """単語セットを盤面に配置できるかの検査結果（単語セットカタログ用）"""
+    packed: bool  # すべての単語を配置できた
+    full_clear: bool  # 全消し可能なレイアウトがある
+    coverage: float  # 単語の文字で埋まるセルの割合（残りは埋め草）
+
+
+def check_term_set_layout(words: List[str], rng: Optional[random.Random] = None,
+                          max_nodes: Optional[int] = None,
+                          time_budget: Optional[float] = None) -> LayoutCheck:
+    """
+    単語セットが盤面に収まるかを、実際のグリッド生成と同じ手順と予算（全消し探索 → 貪欲配置）で検査する
+
+    オフラインのカタログ生成で使うことを想定しており、探索の統計には記録しない。
+
+    Args:
+        words: 大文字に変換済みの単語リスト（重複なし）
+        rng: 乱数生成器
+        max_nodes: 全消し探索のノード数の上限。Noneの場合はGRID_SOLVER_MAX_NODES
+        time_budget: 全消し探索に使えるCPU時間（秒）。Noneの場合はGRID_SOLVER_TIME_BUDGET
+    """
+    if not words or len(set(words)) != len(words) or any(not 0 < len(word) <= GRID_SIZE for word in words):
+        return LayoutCheck(False, False, 0.0)
+
+    rng = rng or random.Random()
+    layout = solve_full_clear_layout(words, rng=rng, time_budget=time_budget, max_nodes=max_nodes)
+    if layout.status == "solved":
+        return LayoutCheck(True, True, 1.0)
+
+    # 貪欲配置で配置できなかった単語はグリッド生成時に黙って落とされる
+    builder = _place_words_greedily(words, rng)
+    packed = all(
+        any(all(builder.cells[cell] == char for char, cell in zip(word, candidate.segment.cells))
+            for candidates in _word_candidates(word).values() for candidate in candidates)
+        for word in words
+    )
+    return LayoutCheck(packed, False, builder.occupied.bit_count() / GRID_CELLS)
+
+
+def _record_solver_result(status: str) -> None:
+    """レイアウト探索の結果を集計"""
+    with _solver_stats_lock:
+        _solver_stats[status] += 1
+
+
+def get_solver_stats() -> Dict[str, float]:
+    """レイアウト探索の統計（フォールバック率を含む）を取得"""
+    with _solver_stats_lock:
+        stats = dict(_solver_stats)
+    total = sum(stats.values())
+    fallbacks = stats["infeasible"] + stats["timeout"]
+    stats["fallback"] = fallbacks
+    stats["fallback_ratio"] = fallbacks / total if total else 0.0
+    return stats
 
 
 def calculate_points(full_name: str, combo_count: int, is_duplicate: bool = False) -> int:
@@ -228,29 +544,50 @@ def calculate_points(full_name: str, combo_count: int, is_duplicate: bool = Fals
         return char_count * (10 + combo_count)
 
 
-def create_new_grid(grid: List[List[str]], selection: List) -> List[List[str]]:
-    """選択されたセルを空にした新しいグリッドを作成"""
-    new_grid = [row[:] for row in grid]
+def selection_path(selection: List) -> Tuple[int, ...]:
+    """選択されたセルのインデックス列"""
+    return tuple(cell.row * GRID_SIZE + cell.col for cell in selection)
+
+
+def selection_mask(selection: List) -> int:
+    """選択されたセルのビットマスク"""
+    mask = 0
     for cell in selection:
-        new_grid[cell.row][cell.col] = ""
-    return new_grid
+        mask |= 1 << (cell.row * GRID_SIZE + cell.col)
+    return mask
+
+
+def pack_grid(grid: List[List[str]]) -> bytes:
+    """グリッドを行優先の25バイトに変換"""
+    return "".join("".join(row) for row in grid).encode("ascii")
+
 
+def unpack_grid(cells: bytes, cleared_mask: int = 0) -> List[List[str]]:
+    """25バイトのグリッドをリストのリストに戻す（消去済みセルは空文字）"""
+    letters = cells.decode("ascii")
+    return [
+        ["" if cleared_mask >> index & 1 else letters[index]
+         for index in range(row * GRID_SIZE, (row + 1) * GRID_SIZE)]
+        for row in range(GRID_SIZE)
+    ]
 
-def get_selected_word(grid: List[List[str]], selection: List) -> str:
-    """選択されたセルからワードを生成"""
-    # 大文字小文字を区別しないよう、常に大文字として返す
-    return "".join([grid[cell.row][cell.col] for cell in selection]).upper()
 
+def read_cells(cells: bytes, cleared_mask: int, path: Tuple[int, ...]) -> str:
+    """25バイトのグリッドから選択されたセルの文字列を読む（消去済みセルは読み飛ばす）"""
+    return "".join(chr(cells[index]) for index in path if not cleared_mask >> index & 1).upper()
 
-def check_field_bonus(grid: List[List[str]]) -> Tuple[int, str, bool]:
-    """フィールドの状態に応じたボーナスを計算
+
+def check_mask_bonus(cleared_mask: int) -> Tuple[int, str, bool]:
+    """消去済みセルのビットマスクからボーナスを計算（グリッドを作らずに判定する）"""
+    return field_bonus(GRID_CELLS - cleared_mask.bit_count())
+
+
+def field_bonus(remaining_cells: int) -> Tuple[int, str, bool]:
+    """残りのセル数に応じたボーナスを計算
 
     Returns:
         Tuple[int, str, bool]: (ボーナスポイント, ボーナスメッセージ, リセットフラグ)
     """
-    # 残りのセル数をカウント
-    remaining_cells = sum(sum(1 for cell in row if cell != "") for row in grid)
-
     # 全消しの場合
     if remaining_cells == 0:
         return 1000, "全消しボーナス！ +1000点", True
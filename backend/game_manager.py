@@ -1,17 +1,126 @@
+import os
+import time
 import uuid
+import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple
 import random
-from fastapi import FastAPI, HTTPException
-
-from models import GameSession, ITTerm, GameLogEntry
-from game_logic import generate_game_grid
-from data.terms import get_terms
+import numpy as np
+from fastapi import FastAPI
+
+from models import ITTerm
+from session_state import SessionState, to_millis
+from session_log import (
+    NO_TERM, ACTION_UPDATE, ACTION_WORD, ACTION_WORD_BONUS, ACTION_DUPLICATE, ACTION_BONUS,
+    ACTION_HIGH_SCORE, ACTION_GAME_END, ACTION_RESET, ACTION_RESET_REFRESHED
+)
+from session_store import create_session_store
+from session_expiry import ExpiryScheduler, ACTION_END_GAME, ACTION_EVICT
+from session_locks import StripedLock
+from game_logic import (
+    Board, restore_board, unpack_grid, read_cells, selection_path
+)
+from grid_pool import grid_pool
+from data.terms import get_term_index
+from data.term_index import term_registry
+from data.term_refresher import BackgroundRefresher
+from data.term_letters import select_rows_with_minimal_overlap
+from data.term_sampler import TERM_CANDIDATE_POOL, TERM_DIFFICULTY_MODE, to_bitset
 
 app = FastAPI()
 
-# メモリ内ゲームストア
-GAME_SESSIONS: Dict[str, GameSession] = {}
+logger = logging.getLogger(__name__)
+
+# ゲームセッションの保存先（環境変数SESSION_STOREで切り替え）
+session_store = create_session_store()
+
+# 同時更新が衝突した場合の再試行回数
+MAX_UPDATE_RETRIES = 5
+
+# セッションごとの更新を直列化するロック（読み込み→評価→書き込みをまとめて保持する）
+session_locks = StripedLock()
+
+# ゲーム時間（秒）と、終了後にセッションを残しておく猶予（秒）
+GAME_DURATION_SECONDS = 120
+SESSION_GRACE_SECONDS = 30
+# タイマーを開始しないまま放置されたセッションを削除するまでの時間（秒）
+UNSTARTED_SESSION_TTL_SECONDS = 600
+
+# 用語IDの対応表から参照されなくなった用語を取り除く間隔（秒）
+TERM_REGISTRY_COMPACT_INTERVAL = float(os.environ.get("TERM_REGISTRY_COMPACT_INTERVAL", "3600"))
+# 最後に使われてからこの秒数が経つまでは、セッションから参照されていなくても取り除かない
+TERM_REGISTRY_IDLE_SECONDS = 600
+_registry_compacted_at = time.monotonic()
+
+# シードから生成したボードのキャッシュ（セッションはシードだけを保持し、必要なときに再構築する）
+_BOARD_CACHE_SIZE = 10000
+_board_cache: "OrderedDict[Tuple[int, Tuple[int, ...], bool], Board]" = OrderedDict()
+_board_cache_lock = threading.Lock()
+
+
+def _board_key(seed: int, term_ids: Tuple[int, ...], debug: bool) -> Tuple[int, Tuple[int, ...], bool]:
+    return seed, term_ids, debug
+
+
+def _intern_terms(terms: List[ITTerm]) -> Tuple[int, ...]:
+    return tuple(term_registry.intern(term) for term in terms)
+
+
+def _remember_board(key: Tuple[int, Tuple[int, ...], bool], board: Board) -> None:
+    with _board_cache_lock:
+        _board_cache[key] = board
+        _board_cache.move_to_end(key)
+        while len(_board_cache) > _BOARD_CACHE_SIZE:
+            _board_cache.popitem(last=False)
+
+
+def acquire_grid(terms: List[ITTerm], debug: bool = False) -> Board:
+    """新しいボードをプールから取得（セッションにはシードと25バイトのグリッドを保存する）"""
+    board = grid_pool.acquire(terms, debug)
+    _remember_board(_board_key(board.seed, _intern_terms(terms), debug), board)
+    return board
+
+
+def get_session_board(game: SessionState) -> Board:
+    """セッションのボード（消去前のグリッドと用語索引）を取得"""
+    key = _board_key(game.grid_seed, game.term_ids, game.debug_mode)
+    with _board_cache_lock:
+        board = _board_cache.get(key)
+        if board is not None:
+            _board_cache.move_to_end(key)
+
+    if board is None:
+        # キャッシュにない場合は保存したグリッドから用語索引を作り直す（グリッドは生成し直さない）
+        board = restore_board(game.grid_seed, game.board, game.terms, get_term_index().by_key)
+        _remember_board(key, board)
+
+    return board
+
+
+def get_session_grid(game: SessionState) -> List[List[str]]:
+    """セッションの現在のグリッド（消去済みセルは空文字）を取得"""
+    return unpack_grid(game.board, game.cleared_mask)
+
+
+def find_selected_term(game: SessionState, selection: List) -> Optional[ITTerm]:
+    """
+    選択されたセルで読める用語を検索
+
+    消去済みセルを含まない直線の選択はボードの索引だけで判定し、
+    それ以外の選択は読める文字列を索引と同じ辞書のハッシュで検索する
+    """
+    board = get_session_board(game)
+    path = selection_path(selection)
+    if board.word_index.covers(path, game.cleared_mask):
+        return board.word_index.find(path)
+    return board.word_index.lookup(read_cells(game.board, game.cleared_mask, path))
+
+
+def count_remaining_words(game: SessionState) -> int:
+    """現在のグリッドでまだ見つけられる用語の数"""
+    return get_session_board(game).word_index.count_remaining(game.cleared_mask)
 
 
 def create_game_session(debug_mode: bool = False, start_timer: bool = True) -> Tuple[str, List[List[str]], List[Dict]]:
@@ -24,7 +133,8 @@ def create_game_session(debug_mode: bool = False, start_timer: bool = True) -> T
 
     # グリッドの生成（フロントエンドでも同様に生成されるが、
     # バックエンドでも初期グリッドを提供）
-    grid = generate_game_grid(terms, debug_mode)
+    # セッションにはシードと25バイトのグリッドだけを保存する
+    board = acquire_grid(terms, debug_mode)
 
     # 現在時刻の取得
     now = datetime.now()
@@ -32,35 +142,70 @@ def create_game_session(debug_mode: bool = False, start_timer: bool = True) -> T
     # タイマーを開始する場合
     if start_timer:
         start_time = now
-        end_time = now + timedelta(seconds=120)
+        end_time = now + timedelta(seconds=GAME_DURATION_SECONDS)
     else:
         # タイマーを開始しない場合は、start_timeとend_timeをNoneに設定
         start_time = None
         end_time = None
 
     # 必要最小限の情報だけを持つセッションを作成
-    new_session = GameSession(
-        session_id=session_id,
-        grid=grid,
-        terms=terms,
-        score=0,
-        start_time=start_time,
-        end_time=end_time,
+    new_session = SessionState(
+        session_id,
+        board.seed,
+        board.cells,
+        _intern_terms(terms),
+        debug_mode=debug_mode,
+        start_ms=to_millis(start_time),
+        end_ms=to_millis(end_time),
         status="active"
     )
 
-    # セッションをメモリに保存
-    GAME_SESSIONS[session_id] = new_session
+    # セッションを保存
+    session_store.create(new_session)
+    _schedule_expiry(new_session)
 
-    return session_id, grid, terms
+    return session_id, board.grid, terms
 
 
-def get_game_session(session_id: str) -> Optional[GameSession]:
+def get_game_session(session_id: str) -> Optional[SessionState]:
     """指定されたIDのゲームセッションを取得"""
-    return GAME_SESSIONS.get(session_id)
+    return session_store.get(session_id)
 
 
-def update_game_session(session_id: str, updates: Dict, log_extras: Dict = None) -> GameSession:
+def _mutate_session(session_id: str, mutate,
+                    expected_version: Optional[int] = None) -> Optional[SessionState]:
+    """
+    セッションのコピーを変更し、compare-and-setで保存する（衝突した場合は読み直して再試行）
+
+    Args:
+        session_id: セッションID
+        mutate: コピーしたセッションを受け取って変更する関数
+        expected_version: 指定した場合、このバージョンのセッションにだけ適用する（再試行しない）
+    """
+    attempts = MAX_UPDATE_RETRIES if expected_version is None else 1
+    # 同じプロセス内の更新はロックで直列化し、他のワーカーとの競合はcompare-and-setで検出する
+    with session_locks.hold(session_id):
+        for _ in range(attempts):
+            current = session_store.get(session_id)
+            if not current:
+                return None
+            if expected_version is not None and current.version != expected_version:
+                break
+
+            game = current.copy()
+            mutate(game)
+
+            if session_store.compare_and_set(game, current.version):
+                if game.end_ms != current.end_ms or game.status != current.status:
+                    _schedule_expiry(game)
+                return game
+
+    logger.warning(f"セッション更新が競合のため失敗しました: {session_id}")
+    return None
+
+
+def update_game_session(session_id: str, updates: Dict, log_extras: Dict = None,
+                        expected_version: Optional[int] = None) -> SessionState:
     """
     ゲームセッションを更新
 
@@ -68,155 +213,239 @@ def update_game_session(session_id: str, updates: Dict, log_extras: Dict = None)
         session_id: セッションID
         updates: 更新内容のディクショナリ
         log_extras: 追加のログ情報（オプション）
+        expected_version: 更新内容を計算したときのバージョン。指定した場合、
+            その後に他の更新があればNoneを返す（古い状態から計算した値で上書きしない）
 
     Returns:
         更新されたゲームセッション
     """
-    game = GAME_SESSIONS.get(session_id)
-    if not game:
-        return None
+    return _mutate_session(session_id, lambda game: apply_session_updates(game, updates, log_extras),
+                           expected_version)
 
-    # ログに記録する内容を収集
-    log_details = {}
 
-    # 追加のログ情報がある場合はマージ
-    if log_extras:
-        log_details.update(log_extras)
+def commit_session_steps(session_id: str, steps: List[Tuple[Dict, Optional[Dict]]],
+                         expected_version: int) -> Optional[SessionState]:
+    """
+    複数の更新をまとめて1回の書き込みで反映（読み込み後に他の更新があった場合はNoneを返す）
+
+    Args:
+        session_id: セッションID
+        steps: (更新内容, ログ情報) のリスト。先頭から順番に適用する
+        expected_version: 更新内容を計算したときのセッションのバージョン
+    """
+    def apply_steps(game: SessionState) -> None:
+        for updates, log_extras in steps:
+            apply_session_updates(game, updates, log_extras)
+
+    return _mutate_session(session_id, apply_steps, expected_version)
+
+
+def apply_session_updates(game: SessionState, updates: Dict, log_extras: Dict = None) -> None:
+    """
+    更新内容をセッションに反映し、イベントログに記録
+
+    Args:
+        game: 更新するセッション
+        updates: 更新内容。"completed_term_id" は完成した単語のIDとしてリストに追加する
+        log_extras: ログ用の情報（term_id, word_points, bonus_points, combo_count, is_duplicate
+            または手動リセットの action_type, refreshed_terms）
+    """
+    score_change = 0
+    new_term_id = NO_TERM
 
-    # 各項目を更新とログ収集
     for key, value in updates.items():
-        if key == "score" and hasattr(game, "score"):
-            score_diff = value - game.score
-            if score_diff > 0 and "score_change" not in log_details:
-                log_details["score_change"] = score_diff
-
-        if key == "completed_terms" and hasattr(game, "completed_terms"):
-            # 完了した単語が追加された場合
-            if len(value) > len(game.completed_terms):
-                new_terms = value[len(game.completed_terms):]
-                # 単語の識別子だけでなく、説明文も含める
-                log_details["new_terms"] = [t.term for t in new_terms]
-
-                # 単語の詳細情報も記録する
-                term_details = []
-                for t in new_terms:
-                    term_details.append({
-                        "term": t.term,
-                        "fullName": t.fullName,
-                        "description": t.description
-                    })
-                log_details["term_details"] = term_details
-
-                # 最初の単語の詳細をログに追加（複数の場合は最初のものだけ）
-                if new_terms and "term" in log_details:
-                    log_details["term_fullName"] = new_terms[0].fullName
-                    log_details["term_description"] = new_terms[0].description
+        if key == "score":
+            score_change = value - game.score
+        elif key == "completed_term_id":
+            # 完成した単語はIDを追加するだけ（リストは作り直さない）
+            game.completed_term_ids.append(value)
+            new_term_id = value
+            continue
 
         # 実際の値を更新
         setattr(game, key, value)
 
-    # 何か重要な変更があった場合はログに記録
-    if log_details:
-        action = "状態更新"
-
-        # 重複単語の場合は特別なログアクション
-        if log_extras and "is_duplicate" in log_extras and log_extras["is_duplicate"]:
-            action = "単語重複"
-            log_details["is_duplicate"] = True
-            if "term" in log_extras:
-                log_details["term"] = log_extras["term"]
-                log_details["message"] = f"単語「{log_extras['term']}」が重複"
-        # 通常の単語完成ケース
-        elif "new_terms" in log_details:
-            if "bonus_points" in log_details and log_details["bonus_points"] > 0:
-                action = "単語完成・ボーナス獲得"
-            else:
-                action = "単語完成"
-        elif "bonus_points" in log_details and log_details["bonus_points"] > 0:
-            action = "ボーナス獲得"
-        elif "score_change" in log_details and log_details["score_change"] > 100:
-            action = "高得点獲得"
-
-        if hasattr(game, "add_log"):
-            game.add_log(action, log_details)
-
-    # セッション保存
-    GAME_SESSIONS[session_id] = game
-
-    return game  # 更新後のゲームセッションを返す
+    extras = log_extras or {}
+
+    # 手動リセット
+    if extras.get("action_type") == "manual_reset":
+        game.events.append(ACTION_RESET_REFRESHED if extras.get("refreshed_terms") else ACTION_RESET,
+                           combo=game.combo_count)
+        return
+
+    # 何か重要な変更があった場合だけログに記録
+    if not extras and score_change <= 0 and new_term_id == NO_TERM:
+        return
+
+    bonus_points = extras.get("bonus_points", 0)
+    word_points = extras.get("word_points", score_change - bonus_points)
+    term_id = extras.get("term_id", new_term_id)
+
+    # 重複単語の場合は特別なログアクション
+    if extras.get("is_duplicate"):
+        action = ACTION_DUPLICATE
+    # 通常の単語完成ケース
+    elif new_term_id != NO_TERM:
+        action = ACTION_WORD_BONUS if bonus_points > 0 else ACTION_WORD
+    elif bonus_points > 0:
+        action = ACTION_BONUS
+    elif score_change > 100:
+        action = ACTION_HIGH_SCORE
+    else:
+        action = ACTION_UPDATE
+
+    game.events.append(action, term_id, word_points, bonus_points,
+                       extras.get("combo_count", game.combo_count))
 
 
 def get_remaining_time(session_id: str) -> int:
     """指定されたセッションの残り時間（秒）を取得"""
-    game = GAME_SESSIONS.get(session_id)
+    game = session_store.get(session_id)
     if not game:
         return 0
 
-    # 現在時刻
-    now = datetime.now()
+    # 現在時刻（ミリ秒）
+    now_ms = to_millis(datetime.now())
 
     # 終了時刻との差を計算
-    if game.end_time:
-        remaining_seconds = (game.end_time - now).total_seconds()
-        return max(0, int(remaining_seconds))
+    if game.end_ms is not None:
+        return max(0, (game.end_ms - now_ms) // 1000)
+
+    # タイマー未開始の場合はゲーム時間をそのまま返す
+    if game.start_ms is None:
+        return GAME_DURATION_SECONDS
 
     # 終了時刻が設定されていない場合は開始時刻から計算
-    elapsed_seconds = (now - game.start_time).total_seconds()
-    remaining_seconds = 120 - elapsed_seconds
-    return max(0, int(remaining_seconds))
+    remaining_ms = GAME_DURATION_SECONDS * 1000 - (now_ms - game.start_ms)
+    return max(0, remaining_ms // 1000)
 
 
-def is_game_expired(game: GameSession) -> bool:
+def is_game_expired(game: SessionState) -> bool:
     """ゲームの制限時間が経過したかチェック"""
-    # 現在時刻
-    now = datetime.now()
+    # 現在時刻（ミリ秒）
+    now_ms = to_millis(datetime.now())
 
     # 終了時刻が設定されている場合はそれを使用
-    if game.end_time:
-        return now >= game.end_time
+    if game.end_ms is not None:
+        return now_ms >= game.end_ms
+
+    # タイマー未開始の場合は期限切れにならない
+    if game.start_ms is None:
+        return False
 
     # 設定されていない場合は開始時刻から計算
-    elapsed_seconds = (now - game.start_time).total_seconds()
-    return elapsed_seconds >= 120
+    return now_ms - game.start_ms >= GAME_DURATION_SECONDS * 1000
 
 
-def end_game_session(session_id: str) -> Optional[GameSession]:
+def end_game_session(session_id: str) -> Optional[SessionState]:
     """ゲームセッションを終了状態に更新"""
-    game = GAME_SESSIONS.get(session_id)
+    def finish(game: SessionState) -> None:
+        # 期限切れの処理などで既に終了している場合は何もしない
+        if game.status == "completed":
+            return
+        game.status = "completed"
+
+        # ゲーム終了ログを追加
+        game.events.append(ACTION_GAME_END, points=game.score, combo=game.combo_count)
+
+        # 時間切れで終了する場合は予定の終了時刻を残し、途中で終了する場合だけ現在時刻にする
+        now = datetime.now()
+        if game.end_time is None or now < game.end_time:
+            game.end_time = now
+
+    return _mutate_session(session_id, finish)
+
+
+def _schedule_expiry(game: SessionState) -> None:
+    """セッションの終了時刻に合わせてタイマーを登録"""
+    if game.end_time is None:
+        # タイマー未開始のセッションは一定時間後に削除
+        expiry_scheduler.schedule(
+            game.session_id,
+            datetime.now() + timedelta(seconds=UNSTARTED_SESSION_TTL_SECONDS),
+            ACTION_EVICT)
+    elif game.status == "active":
+        expiry_scheduler.schedule(game.session_id, game.end_time, ACTION_END_GAME)
+    else:
+        expiry_scheduler.schedule(
+            game.session_id,
+            game.end_time + timedelta(seconds=SESSION_GRACE_SECONDS),
+            ACTION_EVICT)
+
+
+def _expire_game(session_id: str) -> bool:
+    """制限時間になったゲームをサーバー側で終了（終了時刻が延びていた場合は何もしない）"""
+    game = session_store.get(session_id)
+    if not game or game.status != "active" or game.end_time is None:
+        return False
+    if datetime.now() < game.end_time:
+        return False
+    return end_game_session(session_id) is not None
+
+
+def _evict_session(session_id: str) -> bool:
+    """猶予期間が過ぎたセッションを削除（その後に更新されていた場合は何もしない）"""
+    game = session_store.get(session_id)
     if not game:
-        return None
+        return False
 
-    game.status = "completed"
+    now = datetime.now()
+    if game.end_time is None:
+        # タイマー未開始のまま放置されたセッション
+        session_store.delete(session_id)
+        return True
+    if game.status == "completed" or now >= game.end_time:
+        if now >= game.end_time + timedelta(seconds=SESSION_GRACE_SECONDS):
+            session_store.delete(session_id)
+            return True
+    return False
+
+
+# セッションの期限を管理するスケジューラー（アプリケーション起動時にstartする）
+expiry_scheduler = ExpiryScheduler(_expire_game, _evict_session)
+
+
+def restore_session_timers() -> None:
+    """永続化先から復元したセッションのタイマーを登録（期限を過ぎたものはすぐに処理される）"""
+    for game in session_store.restored_sessions():
+        _schedule_expiry(game)
 
-    # ゲーム終了ログを追加
-    if hasattr(game, "add_log"):
-        game.add_log("ゲーム終了", {"final_score": game.score})
 
-    game.end_time = datetime.now()
+def compact_term_registry() -> bool:
+    """どのセッションからも参照されなくなった用語を用語IDの対応表から取り除く"""
+    global _registry_compacted_at
+    removed = term_registry.retain(session_store.term_ids_in_use(), TERM_REGISTRY_IDLE_SECONDS)
+    _registry_compacted_at = time.monotonic()
+    if removed:
+        logger.info(f"参照されなくなった用語を{removed}件取り除きました（残り{len(term_registry)}件）")
+    return True
 
-    return game
 
+def _seconds_until_compaction() -> float:
+    return TERM_REGISTRY_COMPACT_INTERVAL - (time.monotonic() - _registry_compacted_at)
 
-def cleanup_expired_sessions():
-    """期限切れのセッションをクリーンアップ"""
-    to_remove = []
-    for session_id, game in GAME_SESSIONS.items():
-        if is_game_expired(game) or game.status == "completed":
-            # 150秒以上経過したゲームを削除
-            if (datetime.now() - game.start_time).total_seconds() > 150:
-                to_remove.append(session_id)
 
-    for session_id in to_remove:
-        del GAME_SESSIONS[session_id]
+# 用語IDの対応表の定期的な整理（アプリケーション起動時にstartする）
+term_registry_compactor = BackgroundRefresher(
+    "term-registry-compact", compact_term_registry, _seconds_until_compaction, TERM_REGISTRY_COMPACT_INTERVAL)
 
 
-def select_term_set(debug: bool = False, exclude_terms: List[ITTerm] = None) -> List[ITTerm]:
+def get_session_stats() -> Dict[str, int]:
+    """生存中のセッション数と期限処理の統計を取得"""
+    return {"live_sessions": session_store.count(), "registered_terms": len(term_registry),
+            **expiry_scheduler.get_stats()}
+
+
+def select_term_set(debug: bool = False, exclude_terms: List[ITTerm] = None,
+                    seed: Optional[int] = None, difficulty: str = TERM_DIFFICULTY_MODE) -> List[ITTerm]:
     """
     新しい単語セットをランダムに選択する
 
     Args:
         debug: デバッグモードかどうか
         exclude_terms: 除外する単語リスト（前回のセットなど）
+        seed: 乱数シード。同じ辞書・同じシードなら同じ単語セットを返す
+        difficulty: 難易度の重み付けモード（"uniform", "easy", "hard"）
 
     Returns:
         選択された単語リスト
@@ -238,78 +467,31 @@ def select_term_set(debug: bool = False, exclude_terms: List[ITTerm] = None) ->
         return debug_terms
 
     # 通常モード
-    all_terms = get_terms()
-
-    # 除外する単語がある場合
-    if exclude_terms:
-        exclude_set = {term.term for term in exclude_terms}
-        filtered_terms = [
-            term for term in all_terms if term.term not in exclude_set]
+    index = get_term_index()
+    rng = random.Random(seed) if seed is not None else random
+
+    # 除外する単語は用語索引の行番号のビットセットにする（候補リストは作り直さない）
+    excluded_rows = index.row_numbers(exclude_terms) if exclude_terms else []
+    excluded = to_bitset(excluded_rows)
+
+    # 配置できることを事前に確認した単語セットのカタログから選択
+    rows = index.catalog.sample(rng, excluded, difficulty)
+    if rows is not None:
+        return [index.terms[row] for row in rows]
+
+    # カタログがない（または条件に合うセットがない）場合は、難易度で重み付けした抽選で候補を集め、
+    # その中から文字の重なりが少なくなるように選択する
+    pool_size = min(TERM_CANDIDATE_POOL, len(index) - len(excluded_rows))
+    if pool_size < 5:
         # 除外後の単語が少なすぎる場合は全単語から選択
-        if len(filtered_terms) < 5:
-            filtered_terms = all_terms
-    else:
-        filtered_terms = all_terms
+        excluded_rows, excluded = [], 0
+        pool_size = min(TERM_CANDIDATE_POOL, len(index))
+    candidates = index.sampler.draw(rng, pool_size, excluded, difficulty)
+    if candidates is None:
+        # 辞書が小さく抽選で候補が揃わない場合
+        blocked = set(excluded_rows)
+        candidates = [row for row in range(len(index)) if row not in blocked]
 
-    # 単語の文字に基づいて重なりが少なくなるように選択
-    selected_terms = select_terms_with_minimal_overlap(filtered_terms, 5)
+    rows = select_rows_with_minimal_overlap(index.letters, np.array(candidates, dtype=np.int64), 5, rng)
 
-    return selected_terms
-
-
-def select_terms_with_minimal_overlap(terms: List[ITTerm], count: int) -> List[ITTerm]:
-    """
-    文字の重なりが少なくなるように単語を選択する
-
-    Args:
-        terms: 候補となる単語リスト
-        count: 選択する単語数
-
-    Returns:
-        選択された単語リスト
-    """
-    if len(terms) <= count:
-        return terms
-
-    # まずランダムに選択して初期セットを作る
-    selected = random.sample(terms, count)
-
-    # 改善を試みる回数
-    improvement_attempts = 20
-
-    for _ in range(improvement_attempts):
-        # 現在の選択の文字頻度を計算
-        char_frequency = {}
-        for term in selected:
-            for char in term.term:
-                char_frequency[char] = char_frequency.get(char, 0) + 1
-
-        # 未選択の単語から候補を選ぶ
-        unselected = [term for term in terms if term not in selected]
-        if not unselected:
-            break
-
-        # ランダムに入れ替える単語を選択
-        to_replace = random.choice(selected)
-
-        # to_replaceの文字頻度影響を削除
-        for char in to_replace.term:
-            char_frequency[char] = char_frequency.get(char, 0) - 1
-
-        # 最も重なりが少ない単語を探す
-        best_term = None
-        lowest_overlap = float('inf')
-
-        for candidate in unselected:
-            overlap = sum(char_frequency.get(char, 0)
-                          for char in candidate.term)
-            if overlap < lowest_overlap:
-                lowest_overlap = overlap
-                best_term = candidate
-
-        if best_term:
-            # 単語を入れ替え
-            selected.remove(to_replace)
-            selected.append(best_term)
-
-    return selected
+    return [index.terms[row] for row in rows]
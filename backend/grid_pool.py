@@ -0,0 +1,190 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from models import ITTerm
+from game_logic import Board, build_board
+from data.terms import get_term_index
+
+logger = logging.getLogger(__name__)
+
+# 単語セットごとのプール設定
+GRID_POOL_HIGH_WATERMARK = int(os.environ.get("GRID_POOL_HIGH_WATERMARK", "8"))  # 補充の目標数
+GRID_POOL_LOW_WATERMARK = int(os.environ.get("GRID_POOL_LOW_WATERMARK", "3"))  # これを下回ったら補充
+GRID_POOL_MAX_TERM_SETS = int(os.environ.get("GRID_POOL_MAX_TERM_SETS", "2000"))  # 保持する単語セット数の上限
+
+PoolKey = Tuple[str, ...]
+
+
+class _PoolEntry:
+    """単語セット1つ分の事前生成グリッド"""
+
+    __slots__ = ("terms", "boards", "refill_requested_at")
+
+    def __init__(self, terms: List[ITTerm]):
+        self.terms = list(terms)
+        self.boards: Deque[Board] = deque()
+        self.refill_requested_at: Optional[float] = None
+
+
+class GridPool:
+    """
+    単語セットごとにグリッドを事前生成しておき、O(1)で払い出すプール
+
+    バックグラウンドワーカーが低水位を下回った単語セットを高水位まで補充する。
+    単語セットはLRUで管理し、上限を超えたら最も長く使われていないものを破棄する。
+    """
+
+    def __init__(self, high_watermark: int = GRID_POOL_HIGH_WATERMARK,
+                 low_watermark: int = GRID_POOL_LOW_WATERMARK,
+                 max_term_sets: int = GRID_POOL_MAX_TERM_SETS):
+        self.high_watermark = high_watermark
+        self.low_watermark = min(low_watermark, high_watermark)
+        self.max_term_sets = max_term_sets
+
+        self._entries: "OrderedDict[PoolKey, _PoolEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refill_queue: "queue.Queue[Optional[PoolKey]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+        # 統計情報
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._refill_count = 0
+        self._refill_lag_total = 0.0
+        self._refill_lag_max = 0.0
+
+    @staticmethod
+    def make_key(terms: List[ITTerm]) -> PoolKey:
+        """単語セットのキー（大文字の単語の並び）"""
+        return tuple(term.term.upper() for term in terms)
+
+    def start(self) -> None:
+        """補充ワーカーを起動"""
+        if self._worker and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(
+            target=self._run_worker, name="grid-pool-refill", daemon=True)
+        self._worker.start()
+        logger.info("グリッドプールの補充ワーカーを起動しました")
+
+    def stop(self) -> None:
+        """補充ワーカーを停止"""
+        if self._worker and self._worker.is_alive():
+            self._refill_queue.put(None)
+            self._worker.join(timeout=5)
+        self._worker = None
+
+    def acquire(self, terms: List[ITTerm], debug: bool = False) -> Board:
+        """
+        単語セットのグリッドを1つ払い出す（プールが空の場合はその場で生成）
+
+        Returns:
+            用語索引付きのBoard（セッションには board.seed と board.cells を保存する）
+        """
+        # デバッグ用グリッドは生成コストがほぼないためプールしない
+        if debug:
+            return build_board(terms, get_term_index().by_key, debug)
+
+        key = self.make_key(terms)
+        board = None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _PoolEntry(terms)
+                self._entries[key] = entry
+                self._evict_locked()
+            else:
+                self._entries.move_to_end(key)
+
+            if entry.boards:
+                board = entry.boards.popleft()
+                self._hits += 1
+            else:
+                self._misses += 1
+
+            self._request_refill_locked(key, entry)
+
+        if board is None:
+            board = build_board(terms, get_term_index().by_key, debug)
+        return board
+
+    def get_stats(self) -> Dict[str, float]:
+        """ヒット率・補充遅延などの統計情報を取得"""
+        with self._lock:
+            requests = self._hits + self._misses
+            return {
+                "term_sets": len(self._entries),
+                "pooled_grids": sum(len(entry.boards) for entry in self._entries.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / requests if requests else 0.0,
+                "evictions": self._evictions,
+                "refills": self._refill_count,
+                "refill_lag_avg_ms": (self._refill_lag_total / self._refill_count * 1000
+                                      if self._refill_count else 0.0),
+                "refill_lag_max_ms": self._refill_lag_max * 1000,
+                "refill_queue": self._refill_queue.qsize(),
+            }
+
+    def _request_refill_locked(self, key: PoolKey, entry: _PoolEntry) -> None:
+        """低水位を下回っていれば補充を予約（ロック取得済みで呼ぶ）"""
+        if len(entry.boards) < self.low_watermark and entry.refill_requested_at is None:
+            entry.refill_requested_at = time.monotonic()
+            self._refill_queue.put(key)
+
+    def _evict_locked(self) -> None:
+        """上限を超えた単語セットをLRUで破棄（ロック取得済みで呼ぶ）"""
+        while len(self._entries) > self.max_term_sets:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _run_worker(self) -> None:
+        """補充キューを処理するワーカーループ"""
+        while True:
+            key = self._refill_queue.get()
+            if key is None:
+                break
+            try:
+                self._refill(key)
+            except Exception as e:
+                logger.error(f"グリッドプールの補充中にエラー: {str(e)}")
+
+    def _refill(self, key: PoolKey) -> None:
+        """単語セットのグリッドを高水位まで生成"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return  # 既に破棄された
+            missing = self.high_watermark - len(entry.boards)
+            terms = entry.terms
+
+        boards: List[Board] = []
+        try:
+            # グリッド生成はロックの外で行う
+            dictionary = get_term_index().by_key
+            for _ in range(max(0, missing)):
+                boards.append(build_board(terms, dictionary))
+        finally:
+            # 生成に失敗した場合も予約を解除し、次の払い出しで補充を予約し直せるようにする
+            with self._lock:
+                lag = time.monotonic() - entry.refill_requested_at
+                entry.refill_requested_at = None
+                self._refill_count += 1
+                self._refill_lag_total += lag
+                self._refill_lag_max = max(self._refill_lag_max, lag)
+
+                # 生成できた分をプールに入れる（生成中に破棄された場合は捨てる）
+                if self._entries.get(key) is entry:
+                    space = self.high_watermark - len(entry.boards)
+                    entry.boards.extend(boards[:max(0, space)])
+
+
+# アプリケーション全体で共有するプール
+grid_pool = GridPool()
@@ -1,24 +1,39 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Header, Response, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Optional
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
+import asyncio
+import json
 import os
 from dotenv import load_dotenv
 
 from models import (
     ITTerm, GameGrid, TermRequest,
-    RefreshGridRequest, ValidateSelectionRequest, ScoreSubmission
+    RefreshGridRequest, ValidateSelectionRequest, ValidateBatchRequest, ScoreSubmission
 )
-from data.terms import get_terms, find_term, _update_cache, initialize_cache
+from data.terms import (
+    find_term, _update_cache, initialize_cache, get_term_index, get_db_health, get_cache_stats,
+    term_cache_refresher
+)
+from data.term_index import term_registry
+from data.term_responses import term_response_cache, choose_encoding, etag_matches
 from game_logic import (
-    generate_game_grid, calculate_points,
-    create_new_grid, get_selected_word, check_field_bonus
+    calculate_points,
+    check_mask_bonus, get_solver_stats,
+    selection_mask
 )
 from game_manager import (
     create_game_session, get_game_session,
-    update_game_session, is_game_expired,
-    end_game_session, cleanup_expired_sessions, select_term_set, get_remaining_time
+    update_game_session, commit_session_steps, apply_session_updates, is_game_expired,
+    end_game_session, select_term_set, get_remaining_time,
+    expiry_scheduler, get_session_stats, restore_session_timers, session_store, session_locks,
+    term_registry_compactor,
+    acquire_grid, get_session_grid, find_selected_term, count_remaining_words
 )
+from grid_pool import grid_pool
 from database.db_manager import DBManager
 from database.score_repository import ScoreRepository
 
@@ -29,6 +44,12 @@ load_dotenv()  # .envファイルを読み込む
 DEBUG_MODE = os.environ.get("DEBUG_MODE", "false").lower() in [
     "true", "1", "yes"]
 
+# バッチ検証で一度に受け付ける選択の上限
+MAX_BATCH_SELECTIONS = 20
+
+# WebSocketでタイマーを送る間隔（秒）
+WS_TICK_INTERVAL = float(os.environ.get("WS_TICK_INTERVAL", "1"))
+
 app = FastAPI(title="IT用語パズルゲームAPI")
 
 # CORS設定
@@ -40,6 +61,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "ETag"],
 )
 
 # DB初期化時にテーブル作成を追加
@@ -52,40 +74,98 @@ score_repository = ScoreRepository(db_manager)
 
 @app.on_event("startup")
 async def startup_event():
-    # 定期的に古いセッションをクリーンアップ
-    cleanup_expired_sessions()
-    
+    # セッションの期限（ゲーム終了・削除）を管理するスケジューラーを起動
+    # 再起動で復元したセッションがある場合はそのタイマーも登録する
+    restore_session_timers()
+    expiry_scheduler.start()
+    session_store.start()
+    term_registry_compactor.start()
+
     # IT用語キャッシュを初期化（データベース接続を試行）
     # リトライ機能付きの初期化関数を使用
     initialize_cache(force=True)  # 強制的に新しく初期化
+    # 以降の更新はバックグラウンドで行い、リクエストは常に現在のキャッシュを使う
+    term_cache_refresher.start()
+
+    # グリッドの事前生成ワーカーを起動
+    grid_pool.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    grid_pool.stop()
+    term_cache_refresher.stop()
+    expiry_scheduler.stop()
+    session_store.stop()
+    term_registry_compactor.stop()
 
 # API エンドポイント
 
 
 @app.get("/api/terms", response_model=List[ITTerm])
-def api_get_terms(search: Optional[str] = None, sort_by: str = "term", sort_order: str = "asc"):
-    """IT用語を取得（検索・ソート機能付き）"""
-    terms = get_terms()
-
-    # 検索フィルタリング
-    if search:
-        search = search.lower()
-        terms = [term for term in terms if
-                 search in term.term.lower() or
-                 search in term.fullName.lower() or
-                 search in term.description.lower()]
-
-    # ソート
-    if sort_by == "term":
-        terms.sort(key=lambda x: x.term.lower(),
-                   reverse=(sort_order == "desc"))
-    elif sort_by == "fullName":
-        terms.sort(key=lambda x: x.fullName.lower(),
-                   reverse=(sort_order == "desc"))
-    elif sort_by == "difficulty":
-        terms.sort(key=lambda x: x.difficulty, reverse=(sort_order == "desc"))
-
-    return terms
+def api_get_terms(search: Optional[str] = None, sort_by: str = "term", sort_order: str = "asc",
+                  page: int = 1, page_size: Optional[int] = None,
+                  if_none_match: Optional[str] = Header(None), accept_encoding: Optional[str] = Header(None)):
+    """
+    IT用語を取得（検索・ソート・ページ分割機能付き）
+
+    並び順は用語索引のバージョンごとに計算済みのものを使い、リクエストごとには並び替えない。
+    検索結果は用語に一致したもの、正式名称に一致したもの、説明文だけに一致したものの順に並べる。
+    page_size を指定した場合はそのページだけを返し、件数の合計を X-Total-Count ヘッダーで返す。
+    レスポンスは用語索引のバージョンごとにエンコード・圧縮済みのものを返し、
+    If-None-Match がETagと一致する場合は本文なしの304を返す。
+    """
+    entry = term_response_cache.get(get_term_index(), search, sort_by, sort_order == "desc", page, page_size)
+    encoding = choose_encoding(accept_encoding, entry.bodies)
+    headers = {
+        "ETag": entry.etag_for(encoding),
+        "X-Total-Count": str(entry.total),
+        "Cache-Control": "no-cache",  # 保存してよいが、使う前に必ず再検証する
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(if_none_match, entry):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=entry.bodies[encoding], media_type="application/json", headers=headers)
+
+
+@app.get("/api/terms/prefix")
+def api_check_prefix(q: str):
+    """選択途中の文字列が用語の先頭部分か・用語そのものかを判定（選択中のフィードバック用）"""
+    index = get_term_index()
+    is_prefix, is_term = index.trie.lookup(q)
+    return {"prefix": is_prefix, "term": is_term, "version": index.digest}
+
+
+@app.get("/api/terms/trie")
+def api_get_term_trie(version: Optional[str] = None, if_none_match: Optional[str] = Header(None),
+                      accept_encoding: Optional[str] = Header(None)):
+    """
+    プレフィックス木をまとめて取得（クライアントは辞書のバージョンごとに一度だけ取得する）
+
+    /api/terms と同じく、辞書のバージョンごとにエンコード・圧縮済みのものを返し、
+    If-None-Match がETagと一致する場合は本文なしの304を返す。
+
+    Args:
+        version: クライアントが保持しているバージョン。最新と同じ場合は本体を省略する
+    """
+    index = get_term_index()
+    if version == index.digest:
+        return {"version": index.digest, "unchanged": True}
+
+    entry = term_response_cache.get_trie(index)
+    encoding = choose_encoding(accept_encoding, entry.bodies)
+    headers = {
+        "ETag": entry.etag_for(encoding),
+        "Cache-Control": "no-cache",  # 保存してよいが、使う前に必ず再検証する
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(if_none_match, entry):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=entry.bodies[encoding], media_type="application/json", headers=headers)
 
 
 @app.post("/api/validate")
@@ -123,17 +203,14 @@ def api_start_timer(session_id: str):
     # 現在時刻を取得
     now = datetime.now()
 
-    # タイマーを開始（開始時刻を現在時刻に設定）
-    game.start_time = now
-    # 終了時刻を設定（120秒後）
-    game.end_time = now + timedelta(seconds=120)
-
-    # ゲームセッションを更新
-    update_game_session(session_id, {
+    # タイマーを開始（開始時刻を現在時刻に設定し、終了時刻を120秒後に設定）
+    game = update_game_session(session_id, {
         "start_time": now,
         "end_time": now + timedelta(seconds=120),
         "status": "active"
     })
+    if not game:
+        raise HTTPException(404, "ゲームセッションが見つかりません")
 
     return {
         "session_id": session_id,
@@ -150,13 +227,15 @@ def api_get_game_status(session_id: str):
     if not game:
         raise HTTPException(404, "ゲームセッションが見つかりません")
 
+    # 時間切れの場合はゲーム終了処理（秒に切り捨てた残り時間ではなく終了時刻で判定する）
+    if game.status == "active" and is_game_expired(game):
+        game = end_game_session(session_id)
+        if not game:
+            raise HTTPException(404, "ゲームセッションが見つかりません")
+
     # 残り時間を取得
     remaining_time = get_remaining_time(session_id)
 
-    # 時間切れの場合はゲーム終了処理
-    if remaining_time == 0 and game.status == "active":
-        game = end_game_session(session_id)
-
     # サーバー時刻と残り時間を含めて最小限の情報だけを返す
     return {
         "session_id": game.session_id,
@@ -168,69 +247,64 @@ def api_get_game_status(session_id: str):
 
 
 
-@app.post("/api/game/{session_id}/validate")
-def api_validate_selection(session_id: str, request: ValidateSelectionRequest):
-    """プレイヤーの選択を検証"""
-    game = get_game_session(session_id)
-    if not game:
-        raise HTTPException(404, "ゲームセッションが見つかりません")
-
-    # セッションが有効か確認
-    if game.status != "active" or is_game_expired(game):
-        return {"valid": False, "reason": "ゲームセッションが終了しています"}
+def _evaluate_selection(game, selection: List) -> Tuple[Dict, Dict, Optional[Dict]]:
+    """
+    選択を評価し、セッションに適用すべき内容を計算する（セッション自体は変更しない）
 
-    # 選択からワードを生成
-    selected_word = get_selected_word(game.grid, request.selection)
+    盤面はマスクだけで更新する。レスポンスのグリッドは呼び出し側で更新後のセッションから作る。
 
-    # 単語検証
-    term = find_term(selected_word)
+    Returns:
+        Tuple[Dict, Dict, Optional[Dict]]: (レスポンス, 更新内容, ログ情報)
+    """
+    # 単語検証（セッションのボード索引で検索）
+    term = find_selected_term(game, selection)
     if term:
         # 重複チェック - 既に完了した単語かどうか
-        is_duplicate = any(ct.term == term.term for ct in game.completed_terms)
+        # IDは用語の内容ごとに割り当てるため、辞書の更新で説明文などが変わった同じ用語も重複とみなせるよう用語名で比較する
+        term_id = term_registry.intern(term)
+        key = term.term.upper()
+        is_duplicate = any(term_registry.get(completed_id).term.upper() == key
+                           for completed_id in game.completed_term_ids)
 
         # ポイント計算 - 重複フラグを渡す
         points = calculate_points(
             term.fullName, game.combo_count, is_duplicate)
 
-        # グリッド更新
-        updated_grid = create_new_grid(game.grid, request.selection)
+        # グリッド更新（消去済みセルのマスクに選択したセルを加えるだけ）
+        cleared_mask = game.cleared_mask | selection_mask(selection)
 
         # ボーナスを計算
-        bonus_points, bonus_message, should_reset = check_field_bonus(
-            updated_grid)
+        bonus_points, bonus_message, should_reset = check_mask_bonus(
+            cleared_mask)
 
         # 新しいグリッド生成（ボーナスでリセットが必要な場合）
         if should_reset:
-            new_grid = generate_game_grid(game.terms, DEBUG_MODE)
+            board = acquire_grid(game.terms, DEBUG_MODE)
+            grid_updates = {"grid_seed": board.seed, "board": board.cells, "cleared_mask": 0}
             combo_count = 0  # コンボリセット
         else:
-            new_grid = updated_grid
+            grid_updates = {"cleared_mask": cleared_mask}
             combo_count = game.combo_count + 1
 
         # ログ用の詳細情報
         log_extras = {
             "word_points": points,  # 単語による獲得ポイント
             "bonus_points": bonus_points,  # ボーナスポイント
-            "term": term.term,  # 完成した単語
+            "term_id": term_id,  # 完成した単語
             "combo_count": combo_count,  # コンボ数
             "is_duplicate": is_duplicate  # 重複フラグ（新規追加）
         }
 
-        if bonus_points > 0:
-            log_extras["bonus_message"] = bonus_message
-
         # ゲーム状態更新 - 重複単語の場合の処理
         updates = {
-            "grid": new_grid,
+            **grid_updates,
             "score": game.score + points + bonus_points,
             "combo_count": combo_count
         }
 
         # 重複でない場合のみcompletedTermsを更新
         if not is_duplicate:
-            updates["completed_terms"] = game.completed_terms + [term]
-
-        updated_game = update_game_session(session_id, updates, log_extras)
+            updates["completed_term_id"] = term_id
 
         response = {
             "valid": True,
@@ -238,61 +312,141 @@ def api_validate_selection(session_id: str, request: ValidateSelectionRequest):
             "points": points,
             "bonus_points": bonus_points,
             "bonus_message": bonus_message,
-            "new_score": updated_game.score,
-            "grid": new_grid,
+            "new_score": updates["score"],
             "combo_count": combo_count,
             "is_duplicate": is_duplicate  # フロントエンド用の重複フラグ
         }
 
-        return response
+        return response, updates, log_extras
 
     # 無効な選択の場合（既存コード）
-    new_grid = generate_game_grid(game.terms, DEBUG_MODE)
-    updated_game = update_game_session(session_id, {
-        "grid": new_grid,
+    board = acquire_grid(game.terms, DEBUG_MODE)
+    updates = {
+        "grid_seed": board.seed,
+        "board": board.cells,
+        "cleared_mask": 0,
         "combo_count": 0
-    })
+    }
 
-    return {
+    response = {
         "valid": False,
-        "grid": new_grid,
         "combo_count": 0
     }
 
+    return response, updates, None
+
+
+@app.post("/api/game/{session_id}/validate")
+def api_validate_selection(session_id: str, request: ValidateSelectionRequest):
+    """プレイヤーの選択を検証"""
+    # 同じセッションへの選択は読み込みから書き込みまで順番に処理する
+    with session_locks.hold(session_id):
+        game = get_game_session(session_id)
+        if not game:
+            raise HTTPException(404, "ゲームセッションが見つかりません")
+
+        # セッションが有効か確認
+        if game.status != "active" or is_game_expired(game):
+            return {"valid": False, "reason": "ゲームセッションが終了しています"}
+
+        response, updates, log_extras = _evaluate_selection(game, request.selection)
+        updated_game = update_game_session(session_id, updates, log_extras, game.version)
+        if not updated_game:
+            raise HTTPException(409, "ゲームセッションの更新が競合しました")
+
+    response["grid"] = get_session_grid(updated_game)
+    response["remaining_words"] = count_remaining_words(updated_game)
+    return response
+
+
+@app.post("/api/game/{session_id}/validate_batch")
+def api_validate_selection_batch(session_id: str, request: ValidateBatchRequest):
+    """
+    複数の選択を順番にまとめて検証（通信回数を減らすためのバッチ版）
+
+    すべての選択を作業用コピーに順番に適用してから、最後にまとめてセッションに反映する。
+    途中でエラーになった場合はセッションを変更しない。
+    ボーナスでグリッドが作り直された場合、残りの選択はクライアントが見ていないグリッドに対するものになるため
+    そこで打ち切り、適用しなかった選択を unprocessed として返す（新しいグリッドを見て選び直してもらう）。
+    """
+    # 読み込みから書き込みまでの間に同じセッションの他の選択が入らないようにする
+    with session_locks.hold(session_id):
+        game = get_game_session(session_id)
+        if not game:
+            raise HTTPException(404, "ゲームセッションが見つかりません")
+
+        if len(request.selections) > MAX_BATCH_SELECTIONS:
+            raise HTTPException(400, f"一度に検証できる選択は{MAX_BATCH_SELECTIONS}件までです")
+
+        # セッションが有効か確認
+        if game.status != "active" or is_game_expired(game):
+            return {"valid": False, "reason": "ゲームセッションが終了しています"}
+
+        working = game.copy()
+        steps = []
+        results = []
+        for selection in request.selections:
+            response, updates, log_extras = _evaluate_selection(working, selection)
+            apply_session_updates(working, updates, log_extras)
+            steps.append((updates, log_extras))
+
+            # 各ステップの結果（グリッドは最後の状態だけを返す）
+            results.append(response)
+
+            # グリッドが作り直されたら残りの選択は適用しない
+            if "grid_seed" in updates:
+                break
+        unprocessed = request.selections[len(results):]
+
+        # まとめて1回でセッションに反映（ログは各ステップごとに記録）
+        updated_game = commit_session_steps(session_id, steps, game.version)
+        if not updated_game:
+            raise HTTPException(409, "ゲームセッションの更新が競合しました")
+
+    return {
+        "results": results,
+        "score": updated_game.score,
+        "combo_count": updated_game.combo_count,
+        "grid": get_session_grid(updated_game),
+        "remaining_words": count_remaining_words(updated_game),
+        "unprocessed": unprocessed
+    }
+
 # 手動リセット用エンドポイントの追加
 
 
 @app.post("/api/game/{session_id}/reset")
 def api_reset_grid(session_id: str, refresh_terms: bool = True):
     """フィールドを手動でリセット"""
-    game = get_game_session(session_id)
-    if not game:
-        raise HTTPException(404, "ゲームセッションが見つかりません")
+    with session_locks.hold(session_id):
+        game = get_game_session(session_id)
+        if not game:
+            raise HTTPException(404, "ゲームセッションが見つかりません")
+
+        # 環境変数のデバッグモードを優先
+        use_debug = DEBUG_MODE
+
+        # 単語セットを更新するかどうか
+        if refresh_terms:
+            # select_new_term_set -> select_term_set に修正
+            terms = select_term_set(use_debug, exclude_terms=game.terms)
+        else:
+            terms = game.terms
 
-    # 環境変数のデバッグモードを優先
-    use_debug = DEBUG_MODE
+        # 新しいグリッド生成
+        board = acquire_grid(terms, use_debug)
 
-    # 単語セットを更新するかどうか
-    if refresh_terms:
-        # select_new_term_set -> select_term_set に修正
-        terms = select_term_set(use_debug, exclude_terms=game.terms)
-        # ゲームの単語リストを更新
-        game.terms = terms
-    else:
-        terms = game.terms
-
-    # 新しいグリッド生成
-    new_grid = generate_game_grid(terms, use_debug)
-
-    # コンボリセット（ログ情報も追加）
-    updated_game = update_game_session(session_id, {
-        "grid": new_grid,
-        "terms": terms,  # 新しい単語セットも更新
-        "combo_count": 0
-    }, {"action_type": "manual_reset", "refreshed_terms": refresh_terms})
+        # コンボリセット（ログ情報も追加）
+        updated_game = update_game_session(session_id, {
+            "grid_seed": board.seed,
+            "board": board.cells,
+            "cleared_mask": 0,
+            "terms": terms,  # 新しい単語セットも更新
+            "combo_count": 0
+        }, {"action_type": "manual_reset", "refreshed_terms": refresh_terms})
 
     return {
-        "grid": new_grid,
+        "grid": board.grid,
         "terms": terms,
         "combo_count": 0
     }
@@ -310,9 +464,106 @@ def api_end_game(session_id: str):
     if game.status == "completed":
         return {"session_id": session_id, "final_score": game.score}
 
-    # 終了処理を実行
-    game = end_game_session(session_id)
-    return {"session_id": session_id, "final_score": game.score}
+    # 終了処理を実行（その間に期限切れで削除された場合は最後に読み込んだスコアを返す）
+    ended = end_game_session(session_id)
+    return {"session_id": session_id, "final_score": (ended or game).score}
+
+def _handle_channel_message(session_id: str, message: Dict) -> Dict:
+    """
+    WebSocketで受け取ったメッセージを処理（HTTPのエンドポイントと同じ関数を使う）
+
+    メッセージの種類:
+        validate: {"type": "validate", "selection": [...]}
+        validate_batch: {"type": "validate_batch", "selections": [[...], ...]}
+        status: {"type": "status"}
+    "id" を付けた場合は応答にも同じ "id" を付ける
+    """
+    message_type = message.get("type")
+    try:
+        if message_type == "validate":
+            body = api_validate_selection(session_id, ValidateSelectionRequest.model_validate(message))
+        elif message_type == "validate_batch":
+            body = api_validate_selection_batch(session_id, ValidateBatchRequest.model_validate(message))
+        elif message_type == "status":
+            body = api_get_game_status(session_id)
+        else:
+            body = {"status_code": 400, "detail": f"不明なメッセージです: {message_type}"}
+            message_type = "error"
+    except HTTPException as e:
+        body = {"status_code": e.status_code, "detail": e.detail}
+        message_type = "error"
+    except ValidationError as e:
+        body = {"status_code": 422, "detail": e.errors(include_url=False)}
+        message_type = "error"
+
+    reply = {"type": f"{message_type}_result" if message_type != "error" else "error", **body}
+    if "id" in message:
+        reply["id"] = message["id"]
+    return jsonable_encoder(reply)
+
+
+async def _push_timer(websocket: WebSocket, session_id: str) -> None:
+    """残り時間を定期的に送り、終了時刻になったらゲームを終了して通知する"""
+    while True:
+        try:
+            status = await run_in_threadpool(api_get_game_status, session_id)
+        except HTTPException as e:
+            # セッションが削除された
+            await websocket.send_json({"type": "error", "status_code": e.status_code, "detail": e.detail})
+            return
+
+        if status["status"] == "completed":
+            game = await run_in_threadpool(get_game_session, session_id)
+            await websocket.send_json({
+                "type": "game_over",
+                **status,
+                "final_score": game.score if game else 0
+            })
+            return
+
+        await websocket.send_json({"type": "tick", **status})
+
+        # タイマー未開始の場合は開始されるまで通常の間隔で確認する
+        game = await run_in_threadpool(get_game_session, session_id)
+        delay = WS_TICK_INTERVAL
+        if game and game.end_ms is not None:
+            # 終了時刻ちょうどに通知できるよう、次の送信を終了時刻より後にしない
+            until_end = game.end_ms / 1000 - datetime.now().timestamp()
+            delay = max(0.0, min(delay, until_end))
+        await asyncio.sleep(delay)
+
+
+@app.websocket("/api/game/{session_id}/ws")
+async def api_game_channel(websocket: WebSocket, session_id: str):
+    """
+    ゲームセッション用のWebSocket
+
+    サーバーからは残り時間（tick）と終了通知（game_over）を送る。
+    クライアントからの選択（validate / validate_batch）には同じ接続で応答する。
+    """
+    # セッションの読み込みはロックや永続化先へのアクセスを伴うため、イベントループの外で行う
+    if not await run_in_threadpool(get_game_session, session_id):
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+    ticker = asyncio.create_task(_push_timer(websocket, session_id))
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                message = {}
+            # 更新はロックを使う同期処理のため、HTTPと同じくスレッドプールで実行する
+            reply = await run_in_threadpool(_handle_channel_message, session_id, message)
+            await websocket.send_json(reply)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        ticker.cancel()
+
 
 # 互換性のための古いエンドポイント
 # 新しいアプリケーションでは /api/game/start を使用すべき
@@ -328,8 +579,8 @@ def api_generate_game():
 @app.post("/api/refresh-grid", response_model=GameGrid)
 def api_refresh_grid(request: RefreshGridRequest):
     """古いバージョン互換のためのエンドポイント"""
-    grid = generate_game_grid(request.terms, DEBUG_MODE)
-    return GameGrid(grid=grid, terms=request.terms)
+    board = grid_pool.acquire(request.terms, DEBUG_MODE)
+    return GameGrid(grid=board.grid, terms=request.terms)
 
 
 @app.post("/api/scores")
@@ -376,3 +627,19 @@ def api_complete_game(session_id: str):
         "score": game.score,
         "time_remaining": remaining_time
     }
+
+
+@app.get("/api/metrics")
+def api_get_metrics():
+    """サーバー内部の統計情報を取得"""
+    return {
+        "grid_solver": get_solver_stats(),
+        "grid_pool": grid_pool.get_stats(),
+        "term_index": get_term_index().get_stats(),
+        "term_catalog": get_term_index().catalog.get_stats(),
+        "term_cache": get_cache_stats(),
+        "term_db": get_db_health(),
+        "term_responses": term_response_cache.get_stats(),
+        "sessions": get_session_stats(),
+        "session_locks": session_locks.get_stats()
+    }
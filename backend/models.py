@@ -1,7 +1,10 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
+# グリッドサイズ（選択セルの検証で使うためここで定義し、game_logicも参照する）
+GRID_SIZE = 5
+
 # IT用語データモデル
 class ITTerm(BaseModel):
     term: str
@@ -24,13 +27,17 @@ class RefreshGridRequest(BaseModel):
 
 # 選択セルモデル
 class CellSelection(BaseModel):
-    row: int
-    col: int
+    row: int = Field(ge=0, lt=GRID_SIZE)
+    col: int = Field(ge=0, lt=GRID_SIZE)
 
 # 選択検証リクエスト
 class ValidateSelectionRequest(BaseModel):
     selection: List[CellSelection]
 
+# まとめて検証するリクエスト（選択は先頭から順番に適用する）
+class ValidateBatchRequest(BaseModel):
+    selections: List[List[CellSelection]]
+
 # ゲームログエントリー
 class GameLogEntry(BaseModel):
     """ゲームログエントリー"""
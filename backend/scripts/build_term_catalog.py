@@ -0,0 +1,109 @@
+import sys
+import os
+import argparse
+import itertools
+import logging
+import math
+import random
+import time
+
+# 先にパスを追加してから相対インポートを行う
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from data.terms import get_cache_stats, get_term_index, initialize_cache
+from data.term_catalog import TERM_CATALOG_PATH, write_catalog
+from data.term_letters import select_rows_with_minimal_overlap
+from game_logic import GRID_SIZE, GRID_SOLVER_MAX_NODES, check_term_set_layout
+
+# ロギングの設定
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 1セットあたりの用語数（select_term_setと同じ）
+TERMS_PER_SET = 5
+
+
+def candidate_sets(index, samples: int, rng: random.Random):
+    """
+    検査する単語セットの候補を生成
+
+    組み合わせの総数がsamples以下なら全列挙し、それより多い場合は一様なサンプリングと
+    実行時と同じ文字の重なりが少ない選択を交互に行う（同じセットは1回だけ返す）。
+    """
+    # 盤面に収まらない長さの用語は最初から除く
+    rows = np.array([row for row, term in enumerate(index.terms) if 0 < len(term.term) <= GRID_SIZE],
+                    dtype=np.int64)
+    if len(rows) < TERMS_PER_SET:
+        return
+
+    if math.comb(len(rows), TERMS_PER_SET) <= samples:
+        for combination in itertools.combinations(rows.tolist(), TERMS_PER_SET):
+            yield list(combination)
+        return
+
+    seen = set()
+    row_list = rows.tolist()
+    for i in range(samples):
+        if i % 2:
+            selected = rng.sample(row_list, TERMS_PER_SET)
+        else:
+            selected = select_rows_with_minimal_overlap(index.letters, rows, TERMS_PER_SET, rng)
+        key = frozenset(selected)
+        if key not in seen:
+            seen.add(key)
+            yield sorted(selected)
+
+
+def build_catalog(samples: int, max_nodes: int, seed: int, min_coverage: float):
+    """単語セットを検査して配置可能なものをカタログのエントリにする"""
+    index = get_term_index()
+    rng = random.Random(seed)
+    entries = []
+    checked = 0
+    started = time.perf_counter()
+
+    for rows in candidate_sets(index, samples, rng):
+        checked += 1
+        terms = [index.terms[row] for row in rows]
+        words = [term.term.upper() for term in terms]
+        result = check_term_set_layout(words, random.Random(f"{seed}:{','.join(words)}"), max_nodes)
+        if result.packed and result.coverage >= min_coverage:
+            entries.append({
+                "terms": words,
+                "full_clear": result.full_clear,
+                "coverage": round(result.coverage, 3),
+                "difficulty": round(sum(term.difficulty for term in terms) / len(terms), 2),
+            })
+        if checked % 500 == 0:
+            logger.info(f"進捗: {checked}件検査 / {len(entries)}件採用")
+
+    # 品質の高い順（全消し可能 → 被覆率）に並べる
+    entries.sort(key=lambda entry: (not entry["full_clear"], -entry["coverage"], entry["terms"]))
+    logger.info(f"検査完了: {checked}件中 {len(entries)}件を採用 "
+                f"（全消し可能 {sum(entry['full_clear'] for entry in entries)}件、"
+                f"{time.perf_counter() - started:.1f}秒）")
+    return index.digest, entries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="盤面に配置できる単語セットのカタログを生成します")
+    parser.add_argument("--output", default=TERM_CATALOG_PATH, help="出力先のファイル")
+    parser.add_argument("--samples", type=int, default=20000, help="検査する単語セットの数")
+    parser.add_argument("--max-nodes", type=int, default=GRID_SOLVER_MAX_NODES,
+                        help="1セットあたりの全消し探索ノード数の上限（既定値は実行時のグリッド生成と同じ）")
+    parser.add_argument("--min-coverage", type=float, default=0.0, help="採用する被覆率の下限")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    args = parser.parse_args()
+
+    # カタログは本番の辞書から作る（バックアップデータから作ると一部の用語しか出題されなくなる）
+    initialize_cache(force=True)
+    if get_cache_stats()["source"] != "database":
+        logger.error("データベースから用語を読み込めなかったため、カタログを生成しません")
+        sys.exit(1)
+
+    digest, entries = build_catalog(args.samples, args.max_nodes, args.seed, args.min_coverage)
+    write_catalog(args.output, digest, entries)
+    print(f"カタログを書き出しました: {args.output} ({len(entries)}件)")
@@ -38,6 +38,8 @@ def create_table():
     );
     
     CREATE INDEX idx_term ON ITTerms(term);
+    -- 差分読み込み（updated_at > ?）用インデックス
+    CREATE INDEX idx_updated_at ON ITTerms(updated_at);
     """
 
     db_manager = DBManager()
@@ -54,6 +56,31 @@ def create_table():
     return True
 
 
+def migrate_database():
+    """既存のITTermsテーブルに不足しているインデックスを追加（データは変更しない）"""
+    migrate_sql = """
+    IF NOT EXISTS (SELECT * FROM sys.indexes
+                   WHERE name = 'idx_updated_at' AND object_id = OBJECT_ID('ITTerms'))
+    BEGIN
+        CREATE INDEX idx_updated_at ON ITTerms(updated_at);
+        PRINT 'インデックス idx_updated_at を作成しました';
+    END
+    """
+
+    db_manager = DBManager()
+    try:
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(migrate_sql)
+            conn.commit()
+            print("マイグレーションに成功しました")
+    except Exception as e:
+        print(f"マイグレーションエラー: {str(e)}")
+        return False
+
+    return True
+
+
 def import_terms_from_csv(csv_file_path):
     """CSVファイルからIT用語をインポートしデータベースに登録する"""
     if not os.path.exists(csv_file_path):
@@ -109,6 +136,10 @@ def import_terms_from_csv(csv_file_path):
 
 
 if __name__ == "__main__":
+    # 既存のデータベースはテーブルを作り直さずにインデックスだけを追加する
+    if "--migrate" in sys.argv[1:]:
+        sys.exit(0 if migrate_database() else 1)
+
     print("データベース初期化を開始します...")
 
     if create_table():
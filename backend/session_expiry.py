@@ -0,0 +1,119 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# タイマーの種類
+ACTION_END_GAME = "end_game"  # 制限時間になったらゲームを終了する
+ACTION_EVICT = "evict"  # 猶予期間が過ぎたらセッションを削除する
+
+
+class ExpiryScheduler:
+    """
+    セッションの期限をヒープで管理し、期限が来たものだけを処理するスケジューラー
+
+    登録・取り出しはO(log n)。終了時刻が変わった場合は新しいタイマーを追加するだけにして、
+    古いタイマーはコールバック側でセッションの現在の状態を確認して読み飛ばす。
+    """
+
+    def __init__(self, on_end_game: Callable[[str], bool], on_evict: Callable[[str], bool]):
+        """
+        Args:
+            on_end_game: 制限時間になったセッションを終了する関数（終了した場合True）
+            on_evict: 猶予期間が過ぎたセッションを削除する関数（削除した場合True）
+        """
+        self._callbacks = {ACTION_END_GAME: on_end_game, ACTION_EVICT: on_evict}
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # 統計情報
+        self._games_ended = 0
+        self._sessions_evicted = 0
+        self._stale_timers = 0
+
+    def schedule(self, session_id: str, when: datetime, action: str) -> None:
+        """指定時刻にactionを実行するタイマーを登録"""
+        entry = (when.timestamp(), next(self._counter), session_id, action)
+        with self._condition:
+            heapq.heappush(self._heap, entry)
+            # 先頭が変わった場合は待機中のスレッドを起こす
+            if self._heap[0] is entry:
+                self._condition.notify()
+
+    def start(self) -> None:
+        """スケジューラースレッドを起動"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="session-expiry", daemon=True)
+        self._thread.start()
+        logger.info("セッション期限スケジューラーを起動しました")
+
+    def stop(self) -> None:
+        """スケジューラースレッドを停止"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def get_stats(self) -> Dict[str, int]:
+        """スケジューラーの統計情報を取得"""
+        with self._condition:
+            pending = len(self._heap)
+        return {
+            "pending_timers": pending,
+            "games_ended": self._games_ended,
+            "sessions_evicted": self._sessions_evicted,
+            "stale_timers": self._stale_timers,
+        }
+
+    def _pop_due(self) -> Optional[List[Tuple[float, int, str, str]]]:
+        """期限が来たタイマーを取り出す（来ていなければ次の期限まで待つ）"""
+        with self._condition:
+            while self._running:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+                return due
+            return None
+
+    def _run(self) -> None:
+        while True:
+            due = self._pop_due()
+            if due is None:
+                break
+
+            # コールバックはロックの外で実行する
+            for _, _, session_id, action in due:
+                try:
+                    handled = self._callbacks[action](session_id)
+                except Exception as e:
+                    logger.error(f"セッション期限の処理中にエラー ({action}, {session_id}): {str(e)}")
+                    continue
+
+                if not handled:
+                    self._stale_timers += 1
+                elif action == ACTION_END_GAME:
+                    self._games_ended += 1
+                else:
+                    self._sessions_evicted += 1
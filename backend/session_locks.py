@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+# ロックの数（セッションIDのハッシュで振り分ける）
+SESSION_LOCK_STRIPES = int(os.environ.get("SESSION_LOCK_STRIPES", "256"))
+
+
+class StripedLock:
+    """
+    セッションIDごとの更新を直列化するストライプロック
+
+    同じセッションへの更新は同じロックを使うため順番に実行され、
+    別のセッションはほとんどの場合別のロックになるため並列に実行される。
+    同じスレッドから入れ子で取得できるようにRLockを使う。
+    """
+
+    def __init__(self, stripes: int = SESSION_LOCK_STRIPES):
+        self._locks = [threading.RLock() for _ in range(max(1, stripes))]
+
+        # 統計情報（ストライプごと。各ストライプの値はそのロックを保持している間だけ更新する）
+        self._acquisitions = [0] * len(self._locks)
+        self._contended = [0] * len(self._locks)
+        self._wait_total = [0.0] * len(self._locks)
+        self._wait_max = [0.0] * len(self._locks)
+
+    @contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        """keyに対応するロックを保持する"""
+        stripe = hash(key) % len(self._locks)
+        lock = self._locks[stripe]
+
+        if lock.acquire(blocking=False):
+            waited = None
+        else:
+            # 他のスレッドが保持している場合だけ待ち時間を計測
+            started = time.perf_counter()
+            lock.acquire()
+            waited = time.perf_counter() - started
+
+        try:
+            self._acquisitions[stripe] += 1
+            if waited is not None:
+                self._contended[stripe] += 1
+                self._wait_total[stripe] += waited
+                self._wait_max[stripe] = max(self._wait_max[stripe], waited)
+            yield
+        finally:
+            lock.release()
+
+    def get_stats(self) -> Dict[str, float]:
+        """ロックの競合状況を取得（全ストライプの合計）"""
+        acquisitions = sum(self._acquisitions)
+        contended = sum(self._contended)
+        wait_total = sum(self._wait_total)
+        return {
+            "stripes": len(self._locks),
+            "acquisitions": acquisitions,
+            "contended": contended,
+            "contention_ratio": contended / acquisitions if acquisitions else 0.0,
+            "wait_avg_ms": wait_total / contended * 1000 if contended else 0.0,
+            "wait_max_ms": max(self._wait_max) * 1000,
+        }
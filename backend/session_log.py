@@ -0,0 +1,173 @@
+import os
+import struct
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from models import GameLogEntry
+from data.term_index import term_registry
+from game_logic import field_bonus
+
+# 1セッションあたりに保持するイベント数の上限（超えた分は古いものから上書き）
+SESSION_LOG_CAPACITY = int(os.environ.get("SESSION_LOG_CAPACITY", "64"))
+
+# イベントの種類
+ACTION_UPDATE = 0  # 状態更新
+ACTION_WORD = 1  # 単語完成
+ACTION_WORD_BONUS = 2  # 単語完成・ボーナス獲得
+ACTION_DUPLICATE = 3  # 単語重複
+ACTION_BONUS = 4  # ボーナス獲得
+ACTION_HIGH_SCORE = 5  # 高得点獲得
+ACTION_GAME_END = 6  # ゲーム終了
+ACTION_RESET = 7  # 手動リセット（単語セットはそのまま）
+ACTION_RESET_REFRESHED = 8  # 手動リセット（単語セットも更新）
+
+_ACTION_NAMES = {
+    ACTION_UPDATE: "状態更新",
+    ACTION_WORD: "単語完成",
+    ACTION_WORD_BONUS: "単語完成・ボーナス獲得",
+    ACTION_DUPLICATE: "単語重複",
+    ACTION_BONUS: "ボーナス獲得",
+    ACTION_HIGH_SCORE: "高得点獲得",
+    ACTION_GAME_END: "ゲーム終了",
+    ACTION_RESET: "状態更新",
+    ACTION_RESET_REFRESHED: "状態更新",
+}
+
+NO_TERM = -1
+
+# 固定長レコード: (種類, 用語ID, 単語のポイント, ボーナスポイント, コンボ数, UNIX時刻ミリ秒)
+_RECORD = struct.Struct("<BiiiHq")
+
+LogRecord = Tuple[int, int, int, int, int, int]
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+class EventLog:
+    """
+    セッションのイベントを固定長レコードで保持するリングバッファ
+
+    レコードは種類・用語ID・ポイント・コンボ数・時刻の数値だけで、説明文などは保存しない。
+    従来の形式（GameLogEntry）が必要なときだけ render で変換する。
+    時刻はUNIX時刻のミリ秒のため、永続化して再起動後に復元してもそのまま使える。
+    """
+
+    __slots__ = ("_buffer", "_start", "_count", "_capacity")
+
+    def __init__(self, capacity: int = SESSION_LOG_CAPACITY, buffer: bytes = b""):
+        """
+        Args:
+            capacity: 保持するレコード数の上限
+            buffer: 古い順に並んだレコード（to_bytesの出力）
+        """
+        self._capacity = max(1, capacity)
+        count = len(buffer) // _RECORD.size
+        # 上限を超える分は古いものを捨てる
+        skip = max(0, count - self._capacity)
+        self._buffer = bytearray(buffer[skip * _RECORD.size:count * _RECORD.size])
+        self._start = 0
+        self._count = count - skip
+
+    def append(self, action: int, term_id: int = NO_TERM, points: int = 0, bonus: int = 0,
+               combo: int = 0) -> None:
+        """イベントを追加（上限に達している場合は最も古いイベントを上書き）"""
+        record = _RECORD.pack(action, term_id, points, bonus, combo, _now_ms())
+        if self._count < self._capacity:
+            self._buffer += record
+            self._count += 1
+        else:
+            offset = self._start * _RECORD.size
+            self._buffer[offset:offset + _RECORD.size] = record
+            self._start = (self._start + 1) % self._capacity
+
+    @classmethod
+    def from_bytes(cls, buffer: bytes, capacity: int = SESSION_LOG_CAPACITY) -> 'EventLog':
+        """to_bytesの出力から復元（件数が上限以内であることが分かっている場合の高速版）"""
+        count = len(buffer) // _RECORD.size
+        if count > capacity:
+            return cls(capacity, buffer)
+        log = cls.__new__(cls)
+        log._buffer = bytearray(buffer)
+        log._start = 0
+        log._count = count
+        log._capacity = capacity
+        return log
+
+    def records(self) -> Iterator[LogRecord]:
+        """古い順にレコードを返す"""
+        for i in range(self._count):
+            yield _RECORD.unpack_from(self._buffer, ((self._start + i) % self._capacity) * _RECORD.size)
+
+    def term_ids(self) -> Set[int]:
+        """記録している用語ID"""
+        return {record[1] for record in _RECORD.iter_unpack(self._buffer)} - {NO_TERM}
+
+    def copy(self) -> 'EventLog':
+        log = EventLog.__new__(EventLog)
+        log._buffer = bytearray(self._buffer)
+        log._start = self._start
+        log._count = self._count
+        log._capacity = self._capacity
+        return log
+
+    def to_bytes(self) -> bytes:
+        """古い順に並べたレコードをバイト列に変換"""
+        offset = self._start * _RECORD.size
+        return bytes(self._buffer[offset:] + self._buffer[:offset])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def render(self) -> List[GameLogEntry]:
+        """従来のログ形式に変換"""
+        return [
+            GameLogEntry(action=_ACTION_NAMES.get(record[0], "状態更新"),
+                         details=_render_details(record),
+                         timestamp=datetime.fromtimestamp(record[5] / 1000))
+            for record in self.records()
+        ]
+
+
+def _render_details(record: LogRecord) -> Dict[str, Any]:
+    action, term_id, points, bonus, combo, _ = record
+
+    if action == ACTION_GAME_END:
+        return {"final_score": points}
+    if action in (ACTION_RESET, ACTION_RESET_REFRESHED):
+        return {"action_type": "manual_reset", "refreshed_terms": action == ACTION_RESET_REFRESHED}
+
+    details: Dict[str, Any] = {}
+    if term_id != NO_TERM:
+        term = term_registry.get(term_id)
+        details.update({
+            "word_points": points,
+            "bonus_points": bonus,
+            "term": term.term,
+            "combo_count": combo,
+            "is_duplicate": action == ACTION_DUPLICATE,
+        })
+        if bonus > 0:
+            # ボーナスポイントから残りのセル数を逆算してメッセージを復元
+            remaining_cells = 0 if bonus >= 1000 else 6 - bonus // 50
+            details["bonus_message"] = field_bonus(remaining_cells)[1]
+
+    if points + bonus > 0:
+        details["score_change"] = points + bonus
+
+    if action == ACTION_DUPLICATE:
+        details["message"] = f"単語「{details['term']}」が重複"
+    elif action in (ACTION_WORD, ACTION_WORD_BONUS):
+        term = term_registry.get(term_id)
+        details["new_terms"] = [term.term]
+        details["term_details"] = [{
+            "term": term.term,
+            "fullName": term.fullName,
+            "description": term.description
+        }]
+        details["term_fullName"] = term.fullName
+        details["term_description"] = term.description
+
+    return details
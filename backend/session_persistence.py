@@ -0,0 +1,318 @@
+import gc
+import glob
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import deque
+from typing import Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from models import ITTerm
+from session_state import SessionState
+from session_log import EventLog
+from data.term_index import term_registry
+
+logger = logging.getLogger(__name__)
+
+# 書き込み先のディレクトリ（未設定の場合は永続化しない）
+SESSION_WAL_DIR = os.environ.get("SESSION_WAL_DIR", "")
+# スナップショットを取る間隔（秒）
+SESSION_SNAPSHOT_INTERVAL = float(os.environ.get("SESSION_SNAPSHOT_INTERVAL", "60"))
+# 追記のたびにfsyncするか（falseの場合はflushのみ。プロセスのクラッシュでは失われない）
+SESSION_WAL_FSYNC = os.environ.get("SESSION_WAL_FSYNC", "false").lower() in ["true", "1", "yes"]
+
+# レコードの種類
+OP_PUT = ord("P")  # セッション全体を保存
+OP_DELETE = ord("D")  # セッションを削除
+OP_TERM = ord("T")  # 用語IDと用語の対応（このファイル内のセッションが参照する）
+
+# レコードの枠: (種類, 本体の長さ, 本体のCRC32)
+_FRAME = struct.Struct("<BII")
+# セッション本体の固定長部分
+_SESSION = struct.Struct("<qqIBiHqqBBHIB")
+_NO_TIME = -1
+
+_STATUS_CODES = {"active": 0, "completed": 1}
+_STATUS_NAMES = {code: name for name, code in _STATUS_CODES.items()}
+
+
+def encode_session(session: SessionState) -> bytes:
+    """セッションを固定長ヘッダー + 可変長部分のバイト列に変換"""
+    session_id = session.session_id.encode("utf-8")
+    events = session.events.to_bytes()
+    term_ids = tuple(session.term_ids) + tuple(session.completed_term_ids)
+    header = _SESSION.pack(
+        session.version,
+        session.grid_seed,
+        session.cleared_mask,
+        int(session.debug_mode),
+        session.score,
+        session.combo_count,
+        _NO_TIME if session.start_ms is None else session.start_ms,
+        _NO_TIME if session.end_ms is None else session.end_ms,
+        _STATUS_CODES.get(session.status, 0),
+        len(session.term_ids),
+        len(session.completed_term_ids),
+        len(events),
+        len(session_id),
+    )
+    return b"".join((header, session_id, session.board, struct.pack(f"<{len(term_ids)}I", *term_ids), events))
+
+
+def _ids_struct(count: int) -> struct.Struct:
+    """用語IDの配列の形式（件数ごとに一度だけ作る）"""
+    ids_struct = _ID_STRUCTS.get(count)
+    if ids_struct is None:
+        ids_struct = _ID_STRUCTS[count] = struct.Struct(f"<{count}I")
+    return ids_struct
+
+
+_ID_STRUCTS: Dict[int, struct.Struct] = {}
+
+
+def decode_session(data: bytes, term_map: Dict[int, int], session_id: Optional[str] = None) -> SessionState:
+    """
+    encode_sessionのバイト列からセッションを復元（用語IDはterm_mapで現在のIDに変換）
+
+    起動時に大量に呼ばれるため、形式の解析は固定長部分の1回のunpackと件数ごとに作り置いた形式だけで行う。
+
+    Args:
+        data: encode_sessionの出力
+        term_map: ファイル内の用語ID -> 現在のプロセスの用語ID
+        session_id: 呼び出し側で読み取り済みのセッションID（省略時はdataから読む）
+    """
+    (version, grid_seed, cleared_mask, debug_mode, score, combo_count, start_ms, end_ms,
+     status, term_count, completed_count, events_length, id_length) = _SESSION.unpack_from(data)
+
+    offset = _SESSION.size + id_length
+    if session_id is None:
+        session_id = data[_SESSION.size:offset].decode("utf-8")
+    board = data[offset:offset + 25]
+    offset += 25
+    count = term_count + completed_count
+    ids = [term_map[term_id] for term_id in _ids_struct(count).unpack_from(data, offset)]
+    offset += 4 * count
+    events = EventLog.from_bytes(data[offset:offset + events_length])
+
+    return SessionState(
+        session_id, grid_seed, board, tuple(ids[:term_count]), bool(debug_mode), version, cleared_mask,
+        score, ids[term_count:], combo_count,
+        None if start_ms == _NO_TIME else start_ms,
+        None if end_ms == _NO_TIME else end_ms,
+        _STATUS_NAMES.get(status, "active"),
+        events,
+    )
+
+
+def _frame(op: int, payload: bytes) -> bytes:
+    return _FRAME.pack(op, len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_frames(path: str) -> Iterator[Tuple[int, bytes]]:
+    """ファイルのレコードを順番に読む（途中で壊れている場合はそこで止める）"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset = 0
+            while offset + _FRAME.size <= len(data):
+                op, length, crc = _FRAME.unpack_from(data, offset)
+                payload = data[offset + _FRAME.size:offset + _FRAME.size + length]
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    logger.warning(f"壊れたレコードを検出したため読み込みを中断します: {path} ({offset})")
+                    break
+                yield op, payload
+                offset += _FRAME.size + length
+
+
+class SessionJournal:
+    """
+    セッションの変更を追記するログ（WAL）と定期的なスナップショット
+
+    ファイルは世代ごとに snapshot.<世代> と wal.<世代> の組で、
+    スナップショットはその世代のWALを書き始めた時点の全セッションを持つ。
+    起動時は最新のスナップショットを読み込んでから同じ世代のWALを再生する。
+    用語IDはプロセスごとに異なるため、ファイル内で参照する用語を OP_TERM として一緒に書き込む。
+
+    変更はストアのロック中に append_put / append_delete で書き込み待ちの列に追加して順序を決め、
+    ストアのロックを外してから flush でまとめて書き込む（flush/fsync の間も他のセッションを更新できる）。
+    """
+
+    def __init__(self, directory: str, fsync: bool = SESSION_WAL_FSYNC):
+        self._directory = directory
+        self._fsync = fsync
+        self._generation = 0
+        self._wal = None
+        self._written_terms: Set[int] = set()
+        self._pending_records = 0
+        # 書き込み待ちのレコード（種類, セッションまたはセッションID）
+        self._queue: Deque[Tuple[int, object]] = deque()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, kind: str, generation: int) -> str:
+        return os.path.join(self._directory, f"{kind}.{generation:012d}")
+
+    def _generations(self, kind: str) -> List[int]:
+        generations = []
+        for path in glob.glob(os.path.join(self._directory, f"{kind}.*")):
+            suffix = path.rsplit(".", 1)[1]
+            if suffix.isdigit():
+                generations.append(int(suffix))
+        return sorted(generations)
+
+    def replay(self) -> Dict[str, SessionState]:
+        """最新のスナップショットと同じ世代のWALからセッションを復元"""
+        # 大量の小さなオブジェクトを作るため、復元中はGCを止める（循環参照は作らない）
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._replay()
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _replay(self) -> Dict[str, SessionState]:
+        snapshots = self._generations("snapshot")
+        generation = snapshots[-1] if snapshots else 0
+        self._generation = max([generation] + self._generations("wal"))
+
+        latest: Dict[str, Tuple[bytes, Dict[int, int]]] = {}
+        paths = [self._path("snapshot", generation)] if snapshots else []
+        paths += [self._path("wal", gen) for gen in self._generations("wal") if gen >= generation]
+
+        for path in paths:
+            # 用語IDの対応はファイルごと（書き込んだプロセスごと）に異なる
+            term_map: Dict[int, int] = {}
+            for op, payload in _read_frames(path):
+                if op == OP_PUT:
+                    # 同じセッションは最後の状態だけを復元する
+                    id_length = payload[_SESSION.size - 1]
+                    session_id = payload[_SESSION.size:_SESSION.size + id_length].decode("utf-8")
+                    latest[session_id] = (payload, term_map)
+                elif op == OP_DELETE:
+                    latest.pop(payload.decode("utf-8"), None)
+                elif op == OP_TERM:
+                    (file_id,) = struct.unpack_from("<I", payload)
+                    term = ITTerm(**json.loads(payload[4:].decode("utf-8")))
+                    term_map[file_id] = term_registry.intern(term)
+
+        sessions = {}
+        for session_id, (payload, term_map) in latest.items():
+            try:
+                sessions[session_id] = decode_session(payload, term_map, session_id)
+            except (KeyError, struct.error, UnicodeDecodeError) as e:
+                logger.warning(f"セッションを復元できませんでした: {session_id} ({str(e)})")
+        return sessions
+
+    def open(self) -> int:
+        """
+        新しい世代のWALを開き、その世代番号を返す
+
+        中断されたスナップショットの一時ファイルはここで削除する。復元したセッションのスナップショットは
+        起動を待たせないよう呼び出し側がバックグラウンドで snapshot に渡す（書き終わるまでは前の世代のファイルを残す）。
+        """
+        for temp_path in glob.glob(os.path.join(self._directory, "snapshot.*.tmp")):
+            logger.warning(f"中断されたスナップショットを削除します: {temp_path}")
+            os.remove(temp_path)
+        return self.rotate()
+
+    def rotate(self) -> int:
+        """新しい世代のWALに切り替え、その世代番号を返す（呼び出し側でストアのロックを保持する）"""
+        with self._lock:
+            # 切り替え前に追加された変更は前の世代のWALに書き込み、スナップショットとの境目を一致させる
+            self._write_queued()
+            if self._wal:
+                self._wal.close()
+            self._generation += 1
+            self._wal = open(self._path("wal", self._generation), "ab")
+            self._written_terms = set()
+            self._pending_records = 0
+            return self._generation
+
+    def snapshot(self, sessions: List[SessionState], generation: int) -> None:
+        """世代の開始時点のセッションをスナップショットに書き出し、古い世代のファイルを削除"""
+        written_terms: Set[int] = set()
+        chunks = []
+        for session in sessions:
+            chunks.extend(self._term_frames(session, written_terms))
+            chunks.append(_frame(OP_PUT, encode_session(session)))
+
+        path = self._path("snapshot", generation)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(b"".join(chunks))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+        for kind in ("snapshot", "wal"):
+            for old in self._generations(kind):
+                if old < generation:
+                    os.remove(self._path(kind, old))
+        logger.info(f"セッションのスナップショットを保存しました: {len(sessions)}件 (世代 {generation})")
+
+    def _term_frames(self, session: SessionState, written: Set[int]) -> List[bytes]:
+        frames = []
+        for term_id in tuple(session.term_ids) + tuple(session.completed_term_ids):
+            if term_id not in written:
+                written.add(term_id)
+                term = term_registry.get(term_id)
+                frames.append(_frame(OP_TERM, struct.pack("<I", term_id) + term.model_dump_json().encode("utf-8")))
+        return frames
+
+    def append_put(self, session: SessionState) -> None:
+        """セッションの現在の状態を書き込み待ちに追加（ストアのロック中に呼ぶ）"""
+        self._queue.append((OP_PUT, session))
+
+    def append_delete(self, session_id: str) -> None:
+        """セッションの削除を書き込み待ちに追加（ストアのロック中に呼ぶ）"""
+        self._queue.append((OP_DELETE, session_id))
+
+    def flush(self) -> None:
+        """
+        書き込み待ちのレコードをWALに書き込む（ストアのロックの外で呼ぶ）
+
+        別のスレッドが書き込み中の場合はその完了を待ってから残りをまとめて書き込むため、
+        戻った時点で呼び出し前に追加したレコードは書き込み済みになる。
+        """
+        with self._lock:
+            self._write_queued()
+
+    def _write_queued(self) -> None:
+        frames = []
+        count = 0
+        while self._queue:
+            op, item = self._queue.popleft()
+            if op == OP_PUT:
+                frames.extend(self._term_frames(item, self._written_terms))
+                frames.append(_frame(OP_PUT, encode_session(item)))
+            else:
+                frames.append(_frame(OP_DELETE, item.encode("utf-8")))
+            count += 1
+        if frames:
+            self._write(b"".join(frames), count)
+
+    def _write(self, data: bytes, count: int) -> None:
+        if self._wal is None:
+            return
+        self._wal.write(data)
+        self._wal.flush()
+        if self._fsync:
+            os.fsync(self._wal.fileno())
+        self._pending_records += count
+
+    @property
+    def pending_records(self) -> int:
+        """最後のスナップショット以降に追記したレコード数"""
+        return self._pending_records
+
+    def close(self) -> None:
+        with self._lock:
+            self._write_queued()
+            if self._wal:
+                self._wal.close()
+                self._wal = None
@@ -0,0 +1,103 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from models import GameLogEntry, ITTerm
+from data.term_index import term_registry
+from session_log import EventLog
+
+
+def to_millis(value: Optional[datetime]) -> Optional[int]:
+    """日時をミリ秒単位のUNIX時刻に変換"""
+    return int(value.timestamp() * 1000) if value else None
+
+
+def from_millis(value: Optional[int]) -> Optional[datetime]:
+    """ミリ秒単位のUNIX時刻を日時に変換"""
+    return datetime.fromtimestamp(value / 1000) if value is not None else None
+
+
+class SessionState:
+    """
+    ゲームセッションの内部表現（APIモデルのGameSessionとは別）
+
+    1セッションあたりのメモリを小さく一定に保つため、ボードは25バイトのbytes、
+    用語は用語IDの対応表のID、時刻はミリ秒の整数で保持する。
+    ITTermやdatetimeが必要な箇所ではプロパティで変換する。
+    """
+
+    __slots__ = ("session_id", "version", "grid_seed", "board", "cleared_mask", "debug_mode",
+                 "term_ids", "score", "completed_term_ids", "combo_count", "start_ms", "end_ms",
+                 "status", "events")
+
+    def __init__(self, session_id: str, grid_seed: int, board: bytes, term_ids: Tuple[int, ...],
+                 debug_mode: bool = False, version: int = 0, cleared_mask: int = 0, score: int = 0,
+                 completed_term_ids: Optional[List[int]] = None, combo_count: int = 0,
+                 start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+                 status: str = "active", events: Optional[EventLog] = None):
+        self.session_id = session_id
+        self.version = version  # 保存のたびに増える（compare-and-set用）
+        self.grid_seed = grid_seed
+        self.board = board  # 消去前のグリッド（行優先の25文字）。作成後は変更しない
+        self.cleared_mask = cleared_mask  # 消去済みセルのビットマスク（row * 5 + col）
+        self.debug_mode = debug_mode
+        self.term_ids = term_ids
+        self.score = score
+        self.completed_term_ids = completed_term_ids if completed_term_ids is not None else []
+        self.combo_count = combo_count
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.status = status  # "active", "completed"
+        self.events = events if events is not None else EventLog()  # 上限付きのイベントログ
+
+    @property
+    def terms(self) -> List[ITTerm]:
+        return [term_registry.get(term_id) for term_id in self.term_ids]
+
+    @terms.setter
+    def terms(self, terms: List[ITTerm]) -> None:
+        self.term_ids = tuple(term_registry.intern(term) for term in terms)
+
+    @property
+    def completed_terms(self) -> List[ITTerm]:
+        return [term_registry.get(term_id) for term_id in self.completed_term_ids]
+
+    @completed_terms.setter
+    def completed_terms(self, terms: List[ITTerm]) -> None:
+        self.completed_term_ids = [term_registry.intern(term) for term in terms]
+
+    @property
+    def start_time(self) -> Optional[datetime]:
+        return from_millis(self.start_ms)
+
+    @start_time.setter
+    def start_time(self, value: Optional[datetime]) -> None:
+        self.start_ms = to_millis(value)
+
+    @property
+    def end_time(self) -> Optional[datetime]:
+        return from_millis(self.end_ms)
+
+    @end_time.setter
+    def end_time(self, value: Optional[datetime]) -> None:
+        self.end_ms = to_millis(value)
+
+    @property
+    def logs(self) -> List[GameLogEntry]:
+        """ゲームログ（必要になったときにGameLogEntryへ変換する）"""
+        return self.events.render()
+
+    def copy(self) -> 'SessionState':
+        """更新用のコピーを作成（ボードと用語IDは変更しないため共有する）"""
+        return SessionState(
+            self.session_id, self.grid_seed, self.board, self.term_ids,
+            debug_mode=self.debug_mode,
+            version=self.version,
+            cleared_mask=self.cleared_mask,
+            score=self.score,
+            completed_term_ids=list(self.completed_term_ids),
+            combo_count=self.combo_count,
+            start_ms=self.start_ms,
+            end_ms=self.end_ms,
+            status=self.status,
+            events=self.events.copy(),
+        )
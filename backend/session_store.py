@@ -0,0 +1,342 @@
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from models import ITTerm
+from session_state import SessionState
+from session_log import EventLog
+from session_persistence import SessionJournal, SESSION_WAL_DIR, SESSION_SNAPSHOT_INTERVAL
+from data.terms import get_term_index
+from data.term_index import term_registry
+
+logger = logging.getLogger(__name__)
+
+# セッションストアの設定
+# "memory"（プロセス内）または "redis"（複数ワーカーで共有）
+SESSION_STORE_BACKEND = os.environ.get("SESSION_STORE", "memory").lower()
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+# Redisに保存したセッションの有効期間（ゲーム時間 + 猶予）
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", "600"))
+
+_STATUS_CODES = {"active": "a", "completed": "c"}
+_STATUS_NAMES = {code: name for name, code in _STATUS_CODES.items()}
+
+
+def _encode_term(term_id: int) -> Union[str, Dict]:
+    """辞書にある用語はキーだけ、ない用語（デバッグ用など）は全項目を保存（IDはプロセスごとに異なるため保存しない）"""
+    term = term_registry.get(term_id)
+    if get_term_index().by_key.get(term.term.upper()) == term:
+        return term.term
+    return term.model_dump()
+
+
+def _decode_terms(items: List[Union[str, Dict]], session_id: str) -> List[int]:
+    """
+    保存した用語を現在の用語IDに変換
+
+    キーだけで保存した用語が辞書から消えている場合は、内容を推測せずにその用語を除く
+    （得点やボーナスの判定が変わらないよう、作り直した用語で置き換えない）。
+    """
+    term_ids = []
+    for data in items:
+        if isinstance(data, str):
+            term = get_term_index().by_key.get(data.upper())
+            if term is None:
+                logger.warning(f"辞書から削除された用語をセッションから除きます: {data} ({session_id})")
+                continue
+        else:
+            term = ITTerm(**data)
+        term_ids.append(term_registry.intern(term))
+    return term_ids
+
+
+def serialize_session(session: SessionState) -> str:
+    """セッションを短いキー名のJSONに変換（用語は可能な限りキーだけを保存）"""
+    data = {
+        "id": session.session_id,
+        "v": session.version,
+        "seed": session.grid_seed,
+        "b": session.board.decode("ascii"),
+        "m": session.cleared_mask,
+        "dbg": int(session.debug_mode),
+        "t": [_encode_term(term_id) for term_id in session.term_ids],
+        "s": session.score,
+        "ct": [_encode_term(term_id) for term_id in session.completed_term_ids],
+        "cc": session.combo_count,
+        "st": session.start_ms,
+        "et": session.end_ms,
+        "stat": _STATUS_CODES.get(session.status, session.status),
+        "logs": base64.b64encode(session.events.to_bytes()).decode("ascii"),
+    }
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def deserialize_session(raw: Union[str, bytes]) -> SessionState:
+    """serialize_sessionで変換したJSONからセッションを復元"""
+    data = json.loads(raw)
+    return SessionState(
+        data["id"],
+        data["seed"],
+        data["b"].encode("ascii"),
+        tuple(_decode_terms(data["t"], data["id"])),
+        debug_mode=bool(data["dbg"]),
+        version=data["v"],
+        cleared_mask=data["m"],
+        score=data["s"],
+        completed_term_ids=_decode_terms(data["ct"], data["id"]),
+        combo_count=data["cc"],
+        start_ms=data["st"],
+        end_ms=data["et"],
+        status=_STATUS_NAMES.get(data["stat"], data["stat"]),
+        events=EventLog(buffer=base64.b64decode(data["logs"])),
+    )
+
+
+class SessionStore(ABC):
+    """
+    ゲームセッションの保存先のインターフェース
+
+    更新は compare_and_set で行い、読み込んだ時点の version と保存済みの version が
+    一致する場合だけ書き込む（書き込み時に version を1つ進める）。
+    """
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[SessionState]:
+        """セッションを取得（なければNone）"""
+
+    @abstractmethod
+    def create(self, session: SessionState) -> None:
+        """新しいセッションを保存"""
+
+    @abstractmethod
+    def compare_and_set(self, session: SessionState, expected_version: int) -> bool:
+        """保存済みのversionがexpected_versionと一致する場合だけ上書きする"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """セッションを削除"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """保存中のセッション数"""
+
+    def restored_sessions(self) -> List[SessionState]:
+        """起動時に永続化先から復元したセッション"""
+        return []
+
+    def term_ids_in_use(self) -> Set[int]:
+        """このプロセスが保持しているセッションが参照する用語ID（用語を内容で保存するストアでは空）"""
+        return set()
+
+    def start(self) -> None:
+        """バックグラウンド処理を開始（必要なストアのみ）"""
+
+    def stop(self) -> None:
+        """バックグラウンド処理を停止（必要なストアのみ）"""
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    プロセス内の辞書に保存するストア（単一ワーカー向け）
+
+    journalを指定した場合は変更をWALに追記し、定期的にスナップショットを取る。
+    再起動時はスナップショットとWALからセッションを復元する。
+    """
+
+    def __init__(self, journal: Optional[SessionJournal] = None,
+                 snapshot_interval: float = SESSION_SNAPSHOT_INTERVAL):
+        self._sessions: Dict[str, SessionState] = {}
+        self._lock = threading.Lock()
+        self._journal = journal
+        self._snapshot_interval = snapshot_interval
+        self._restored: List[SessionState] = []
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # 復元直後の世代のスナップショット（起動を待たせないようにバックグラウンドで書き出す）
+        self._initial_snapshot: Optional[Tuple[List[SessionState], int]] = None
+
+        if journal:
+            self._sessions = journal.replay()
+            self._restored = list(self._sessions.values())
+            self._initial_snapshot = (self._restored, journal.open())
+            logger.info(f"セッションを復元しました: {len(self._sessions)}件")
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        return self._sessions.get(session_id)
+
+    def create(self, session: SessionState) -> None:
+        with self._lock:
+            self._sessions[session.session_id] = session
+            if self._journal:
+                self._journal.append_put(session)
+        self._flush_journal()
+
+    def compare_and_set(self, session: SessionState, expected_version: int) -> bool:
+        with self._lock:
+            current = self._sessions.get(session.session_id)
+            if current is None or current.version != expected_version:
+                return False
+            session.version = expected_version + 1
+            self._sessions[session.session_id] = session
+            if self._journal:
+                self._journal.append_put(session)
+        self._flush_journal()
+        return True
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            if self._sessions.pop(session_id, None) is None or not self._journal:
+                return
+            self._journal.append_delete(session_id)
+        self._flush_journal()
+
+    def _flush_journal(self) -> None:
+        # WALへの書き込み（flush/fsync）はストアのロックを外してから行う。順序はロック中に追加した順
+        if self._journal:
+            self._journal.flush()
+
+    def count(self) -> int:
+        return len(self._sessions)
+
+    def restored_sessions(self) -> List[SessionState]:
+        return self._restored
+
+    def term_ids_in_use(self) -> Set[int]:
+        # 保存済みのセッションは書き換えずに差し替えるため、一覧だけをロック中に取る
+        with self._lock:
+            sessions = list(self._sessions.values())
+        term_ids: Set[int] = set()
+        for session in sessions:
+            term_ids.update(session.term_ids)
+            term_ids.update(session.completed_term_ids)
+            term_ids |= session.events.term_ids()
+        return term_ids
+
+    def snapshot(self) -> None:
+        """全セッションをスナップショットに書き出し、WALを新しい世代に切り替える"""
+        if not self._journal:
+            return
+        # ストアのロック中に切り替えることで、スナップショットとWALの境目を一致させる
+        with self._lock:
+            generation = self._journal.rotate()
+            sessions = list(self._sessions.values())
+        self._journal.snapshot(sessions, generation)
+
+    def start(self) -> None:
+        if not self._journal or self._thread:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._snapshot_loop, name="session-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread:
+            self._stop_event.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._journal:
+            # 次回の起動で再生するWALを短くするため、終了時にもスナップショットを取る
+            self.snapshot()
+            self._journal.close()
+
+    def _snapshot_loop(self) -> None:
+        if self._initial_snapshot:
+            # 復元したセッションは新しい世代の開始時点の状態（その後の変更は同じ世代のWALにある）
+            sessions, generation = self._initial_snapshot
+            self._initial_snapshot = None
+            try:
+                self._journal.snapshot(sessions, generation)
+            except OSError as e:
+                logger.error(f"セッションのスナップショットに失敗しました: {str(e)}")
+
+        while not self._stop_event.wait(self._snapshot_interval):
+            if self._journal.pending_records == 0:
+                continue
+            try:
+                self.snapshot()
+            except OSError as e:
+                logger.error(f"セッションのスナップショットに失敗しました: {str(e)}")
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Redisプロトコルのサーバーに保存するストア（複数ワーカーで共有）
+
+    WATCH/MULTI/EXECで比較と書き込みを原子的に行う。期限切れのセッションはTTLで消える。
+    セッション数はキーを走査せずに数えるため、セッションIDと有効期限の時刻をソート済みセットにも保存する。
+    """
+
+    def __init__(self, url: str = REDIS_URL, ttl_seconds: int = SESSION_TTL_SECONDS,
+                 key_prefix: str = "game:session:", expiry_key: str = "game:session-expiry",
+                 client=None):
+        # Redisを使う場合だけ必要な依存関係
+        import redis
+
+        self._redis = redis
+        # clientを渡せばそれを使う（テストでは代替サーバーのクライアントを渡す）
+        self._client = client if client is not None else redis.Redis.from_url(url)
+        self._ttl = ttl_seconds
+        self._prefix = key_prefix
+        self._expiry_key = expiry_key  # セッションID -> 有効期限（UNIX時刻）のソート済みセット
+
+    def _key(self, session_id: str) -> str:
+        return f"{self._prefix}{session_id}"
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        raw = self._client.get(self._key(session_id))
+        return deserialize_session(raw) if raw is not None else None
+
+    def create(self, session: SessionState) -> None:
+        with self._client.pipeline() as pipe:
+            pipe.set(self._key(session.session_id), serialize_session(session), ex=self._ttl)
+            pipe.zadd(self._expiry_key, {session.session_id: time.time() + self._ttl})
+            pipe.execute()
+
+    def compare_and_set(self, session: SessionState, expected_version: int) -> bool:
+        key = self._key(session.session_id)
+        with self._client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                raw = pipe.get(key)
+                if raw is None or json.loads(raw)["v"] != expected_version:
+                    pipe.unwatch()
+                    return False
+                session.version = expected_version + 1
+                pipe.multi()
+                pipe.set(key, serialize_session(session), ex=self._ttl)
+                pipe.zadd(self._expiry_key, {session.session_id: time.time() + self._ttl})
+                pipe.execute()
+                return True
+            except self._redis.WatchError:
+                # 他のワーカーが先に書き込んだ
+                session.version = expected_version
+                return False
+
+    def delete(self, session_id: str) -> None:
+        with self._client.pipeline() as pipe:
+            pipe.delete(self._key(session_id))
+            pipe.zrem(self._expiry_key, session_id)
+            pipe.execute()
+
+    def count(self) -> int:
+        # TTLで消えたセッションをソート済みセットからも取り除いてから件数を数える
+        with self._client.pipeline() as pipe:
+            pipe.zremrangebyscore(self._expiry_key, "-inf", time.time())
+            pipe.zcard(self._expiry_key)
+            return pipe.execute()[1]
+
+
+def create_session_store(backend: str = SESSION_STORE_BACKEND) -> SessionStore:
+    """設定に応じたセッションストアを作成"""
+    if backend == "redis":
+        logger.info(f"Redisセッションストアを使用します: {REDIS_URL}")
+        return RedisSessionStore()
+    if SESSION_WAL_DIR:
+        logger.info(f"セッションをWALとスナップショットで永続化します: {SESSION_WAL_DIR}")
+        return InMemorySessionStore(SessionJournal(SESSION_WAL_DIR))
+    return InMemorySessionStore()
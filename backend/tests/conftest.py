@@ -0,0 +1,5 @@
+import os
+import sys
+
+# バックエンドのモジュールはbackendディレクトリを基準にインポートする
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,166 @@
+import threading
+import time
+
+import pytest
+
+import game_manager
+from session_persistence import SessionJournal
+from session_state import SessionState
+from session_store import InMemorySessionStore, RedisSessionStore
+
+
+def _session(session_id: str = "session-1") -> SessionState:
+    return SessionState(session_id, 1, b"A" * 25, ())
+
+
+def test_compare_and_set_rejects_stale_write():
+    store = InMemorySessionStore()
+    store.create(_session())
+
+    first = store.get("session-1").copy()
+    stale = store.get("session-1").copy()
+
+    first.score = 100
+    assert store.compare_and_set(first, 0)
+    assert store.get("session-1").version == 1
+
+    # 古いバージョンを読み込んだ書き込みは上書きしない
+    stale.score = 999
+    assert not store.compare_and_set(stale, 0)
+    assert store.get("session-1").score == 100
+    assert store.get("session-1").version == 1
+
+
+def test_compare_and_set_missing_session():
+    store = InMemorySessionStore()
+    assert not store.compare_and_set(_session("missing"), 0)
+    assert store.get("missing") is None
+
+
+def test_mutate_session_retries_after_conflict(monkeypatch):
+    store = InMemorySessionStore()
+    store.create(_session())
+    monkeypatch.setattr(game_manager, "session_store", store)
+
+    original = store.compare_and_set
+    calls = []
+
+    def conflicting_compare_and_set(session, expected_version):
+        calls.append(expected_version)
+        if len(calls) == 1:
+            # 最初の書き込みの直前に他のワーカーが更新した状況を再現する
+            other = store.get(session.session_id).copy()
+            other.combo_count = 3
+            assert original(other, expected_version)
+        return original(session, expected_version)
+
+    monkeypatch.setattr(store, "compare_and_set", conflicting_compare_and_set)
+
+    def add_points(game):
+        game.score += 50
+
+    updated = game_manager._mutate_session("session-1", add_points)
+
+    # 衝突後に読み直して再試行し、他の更新を消さずに適用する
+    assert calls == [0, 1]
+    assert updated.version == 2
+    assert store.get("session-1").score == 50
+    assert store.get("session-1").combo_count == 3
+
+
+def test_mutate_session_with_expected_version_does_not_retry(monkeypatch):
+    store = InMemorySessionStore()
+    store.create(_session())
+    monkeypatch.setattr(game_manager, "session_store", store)
+
+    current = store.get("session-1").copy()
+    current.score = 10
+    assert store.compare_and_set(current, 0)
+
+    # 読み込んだ時点のバージョンを指定した更新は、先に更新されていれば適用しない
+    assert game_manager._mutate_session("session-1", lambda game: None, expected_version=0) is None
+    assert store.get("session-1").version == 1
+
+
+def test_journal_replays_latest_version(tmp_path):
+    store = InMemorySessionStore(SessionJournal(str(tmp_path)))
+    store.create(_session())
+    updated = store.get("session-1").copy()
+    updated.score = 70
+    assert store.compare_and_set(updated, 0)
+    store.create(_session("session-2"))
+    store.delete("session-2")
+    store._journal.close()
+
+    # スナップショットを取らずに終了しても、WALから最後の状態を復元する
+    restored = InMemorySessionStore(SessionJournal(str(tmp_path)))
+    assert restored.get("session-1").score == 70
+    assert restored.get("session-1").version == 1
+    assert restored.get("session-2") is None
+
+
+
+def test_journal_write_does_not_hold_store_lock(tmp_path):
+    store = InMemorySessionStore(SessionJournal(str(tmp_path)))
+    store.create(_session())
+    updated = store.get("session-1").copy()
+    updated.score = 30
+
+    # WALへの書き込みが待たされている間も、ストアのロックは空いている
+    store._journal._lock.acquire()
+    writer = threading.Thread(target=store.compare_and_set, args=(updated, 0))
+    writer.start()
+    deadline = time.time() + 5
+    while store.get("session-1").version != 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.get("session-1").version == 1
+    assert store._lock.acquire(timeout=1)
+    store._lock.release()
+    store._journal._lock.release()
+    writer.join()
+    store._journal.close()
+
+    restored = InMemorySessionStore(SessionJournal(str(tmp_path)))
+    assert restored.get("session-1").score == 30
+
+def _redis_store():
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisSessionStore(client=fakeredis.FakeRedis())
+
+
+def test_redis_store_create_and_get():
+    store = _redis_store()
+    store.create(_session())
+
+    restored = store.get("session-1")
+    assert restored.session_id == "session-1"
+    assert restored.version == 0
+    assert store.get("missing") is None
+
+
+def test_redis_store_compare_and_set_rejects_stale_write():
+    store = _redis_store()
+    store.create(_session())
+
+    first = store.get("session-1").copy()
+    stale = store.get("session-1").copy()
+
+    first.score = 100
+    assert store.compare_and_set(first, 0)
+    assert store.get("session-1").version == 1
+
+    # 別の更新でバージョンが進んでいれば、古いバージョンからの書き込みは失敗する
+    stale.score = 5
+    assert not store.compare_and_set(stale, 0)
+    assert store.get("session-1").score == 100
+
+
+def test_redis_store_delete_and_count():
+    store = _redis_store()
+    store.create(_session())
+    store.create(_session("session-2"))
+    assert store.count() == 2
+
+    store.delete("session-2")
+    assert store.get("session-2") is None
+    assert store.count() == 1
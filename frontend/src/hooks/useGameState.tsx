@@ -7,6 +7,21 @@ import apiClient from '@/lib/apiClient'; // apiClientをインポート
 
 // バックエンドAPIのベースURL
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api';
+// WebSocketのベースURL（http→ws, https→wss）
+const WS_URL = API_URL.replace(/^http/, 'ws');
+// WebSocketの再接続の間隔（切れるたびに倍にし、上限で止める）
+const WS_RETRY_BASE_MS = 1000;
+const WS_RETRY_MAX_MS = 30000;
+// WebSocketが切れている間に /status をポーリングする間隔
+const STATUS_POLL_INTERVAL_MS = 5000;
+
+// サーバーから送られるゲーム状態
+interface ServerStatus {
+  remaining_time: number;
+  server_time: string;
+  end_time: string | null;
+  status: string;
+}
 
 // 初期状態
 const initialState: GameState = {
@@ -50,8 +65,7 @@ const GameStateContext = createContext<{
 export function GameStateProvider({ children }: { children: React.ReactNode }) {
   const [state, setState] = useState<GameState>(initialState);
   const timerRef = useRef<NodeJS.Timeout | null>(null);
-  const syncTimerRef = useRef<NodeJS.Timeout | null>(null);
-  const lastFetchTime = useRef<number>(0);
+  const channelRef = useRef<WebSocket | null>(null);
   const requestInProgress = useRef<boolean>(false);
 
   // カウントダウン開始関数
@@ -108,6 +122,12 @@ export function GameStateProvider({ children }: { children: React.ReactNode }) {
   const syncWithServer = async () => {
     if (!state.sessionId || state.gameOver) return;
 
+    // WebSocketが接続中なら状態を要求するだけ（応答はチャンネルで受け取る）
+    if (channelRef.current && channelRef.current.readyState === WebSocket.OPEN) {
+      channelRef.current.send(JSON.stringify({ type: 'status' }));
+      return;
+    }
+
     try {
       // サーバーからの時間を取得
       const response = await axios.get(`${API_URL}/game/${state.sessionId}/status`);
@@ -167,11 +187,6 @@ export function GameStateProvider({ children }: { children: React.ReactNode }) {
       setState(prev => {
         // 時間切れなら、ゲームオーバーに
         if (remainingSecs <= 0 && !prev.gameOver) {
-          if (syncTimerRef.current) {
-            clearInterval(syncTimerRef.current);
-            syncTimerRef.current = null;
-          }
-
           handleGameOver();
           return { ...prev, time: 0, gameOver: true, timerStarted: false };
         }
@@ -187,9 +202,9 @@ export function GameStateProvider({ children }: { children: React.ReactNode }) {
       timerRef.current = null;
     }
 
-    if (syncTimerRef.current) {
-      clearInterval(syncTimerRef.current);
-      syncTimerRef.current = null;
+    if (channelRef.current) {
+      channelRef.current.close();
+      channelRef.current = null;
     }
 
     if (state.sessionId) {
@@ -301,80 +316,137 @@ export function GameStateProvider({ children }: { children: React.ReactNode }) {
     }
   };
 
-  // ゲームステータス取得関数
-  const fetchGameStatus = useCallback(async () => {
-    if (!state.sessionId || state.gameOver) return;
-
-    try {
-      const now = Date.now();
-      if (now - lastFetchTime.current < 2000) return;
-
-      lastFetchTime.current = now;
+  // サーバーから受け取ったゲーム状態を反映
+  const applyServerStatus = useCallback((data: ServerStatus) => {
+    // サーバー時間関連の情報のみ取得
+    const serverTime = new Date(data.server_time).getTime();
+    const endTime = data.end_time ? new Date(data.end_time).getTime() : null;
+    const remainingTime = data.remaining_time;
 
-      const response = await axios.get(`${API_URL}/game/${state.sessionId}/status`);
+    const clientTime = Date.now();
+    const timeOffset = serverTime - clientTime;
 
-      // サーバー時間関連の情報のみ取得
-      const serverTime = new Date(response.data.server_time).getTime();
-      const endTime = new Date(response.data.end_time).getTime();
-      const remainingTime = response.data.remaining_time;
+    const isGameOver = data.status === "completed" || remainingTime <= 0;
 
-      const clientTime = Date.now();
-      const timeOffset = serverTime - clientTime;
+    if (isGameOver && !state.gameOver) {
+      handleGameOver();
+    }
 
-      const isGameOver = response.data.status === "completed" || remainingTime <= 0;
+    // 時間関連の情報のみ更新
+    setState(prev => ({
+      ...prev,
+      time: remainingTime,
+      endTime: endTime,
+      serverTimeOffset: timeOffset,
+      gameOver: isGameOver
+      // その他の状態はフロントエンドで管理しているものを維持
+    }));
+  }, [state.gameOver, handleGameOver]);
 
-      if (isGameOver && !state.gameOver) {
-        handleGameOver();
-      }
+  // プレイ中はWebSocketでサーバーからタイマーと終了通知を受け取る
+  // 接続が切れた場合は間隔を延ばしながら再接続し、切れている間だけ /status をポーリングする
+  const applyServerStatusRef = useRef(applyServerStatus);
+  applyServerStatusRef.current = applyServerStatus;
 
-      // 時間関連の情報のみ更新
-      setState(prev => ({
-        ...prev,
-        time: remainingTime,
-        endTime: endTime,
-        serverTimeOffset: timeOffset,
-        gameOver: isGameOver
-        // その他の状態はフロントエンドで管理しているものを維持
-      }));
-    } catch (error) {
-      console.error('Failed to fetch game status:', error);
+  useEffect(() => {
+    if (!state.sessionId || state.gameOver || state.gamePhase !== 'playing') {
+      return;
     }
-  }, [state.sessionId, state.gameOver, handleGameOver]);
 
-  useEffect(() => {
-    if (state.sessionId && !state.gameOver && state.gamePhase === 'playing') {
-      if (syncTimerRef.current) {
-        return;
+    const sessionId = state.sessionId;
+    let stopped = false;
+    let retryDelay = WS_RETRY_BASE_MS;
+    let retryTimer: ReturnType<typeof setTimeout> | null = null;
+    let pollTimer: ReturnType<typeof setInterval> | null = null;
+
+    const fetchGameStatus = async () => {
+      try {
+        const response = await axios.get(`${API_URL}/game/${sessionId}/status`);
+        if (!stopped) {
+          applyServerStatusRef.current(response.data);
+        }
+      } catch (error) {
+        console.error('Failed to fetch game status:', error);
       }
+    };
 
+    const startPolling = () => {
+      if (pollTimer) return;
       console.log('Starting polling for game status');
+      fetchGameStatus();
+      pollTimer = setInterval(fetchGameStatus, STATUS_POLL_INTERVAL_MS);
+    };
 
-      // 5秒ごとに変更（より長い間隔に）
-      const interval = setInterval(() => {
-        fetchGameStatus();
-      }, 5000);
+    const stopPolling = () => {
+      if (!pollTimer) return;
+      console.log('Stopping polling - game channel connected');
+      clearInterval(pollTimer);
+      pollTimer = null;
+    };
 
-      syncTimerRef.current = interval;
+    const connect = () => {
+      retryTimer = null;
+      console.log('Opening game channel');
+      const channel = new WebSocket(`${WS_URL}/game/${sessionId}/ws`);
+      channelRef.current = channel;
 
-      return () => {
-        console.log('Cleaning up polling interval');
-        clearInterval(interval);
-        syncTimerRef.current = null;
+      channel.onopen = () => {
+        retryDelay = WS_RETRY_BASE_MS;
+        stopPolling();
       };
-    } else if (syncTimerRef.current) {
-      console.log('Stopping polling - game not active');
-      clearInterval(syncTimerRef.current);
-      syncTimerRef.current = null;
-    }
-  }, [state.sessionId, state.gameOver, state.gamePhase, fetchGameStatus]);
+
+      channel.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'tick' || message.type === 'status_result' || message.type === 'game_over') {
+          applyServerStatusRef.current(message);
+        }
+      };
+
+      channel.onerror = (error) => {
+        // 接続できなくてもフロントエンドのタイマーとポーリングで進行する
+        console.error('Game channel error:', error);
+      };
+
+      channel.onclose = (event) => {
+        // こちらから閉じた場合（ゲーム終了・画面遷移）は再接続しない
+        if (stopped || channelRef.current !== channel) return;
+        channelRef.current = null;
+        // セッションが見つからない場合は再接続しても同じ
+        if (event.code === 4404) return;
+
+        startPolling();
+        console.log(`Game channel closed, reconnecting in ${retryDelay}ms`);
+        retryTimer = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, WS_RETRY_MAX_MS);
+      };
+    };
+
+    connect();
+
+    return () => {
+      console.log('Closing game channel');
+      stopped = true;
+      if (retryTimer) {
+        clearTimeout(retryTimer);
+      }
+      if (pollTimer) {
+        clearInterval(pollTimer);
+      }
+      const channel = channelRef.current;
+      channelRef.current = null;
+      if (channel) {
+        channel.close();
+      }
+    };
+  }, [state.sessionId, state.gameOver, state.gamePhase]);
 
   useEffect(() => {
     return () => {
       if (timerRef.current) {
         clearInterval(timerRef.current);
       }
-      if (syncTimerRef.current) {
-        clearInterval(syncTimerRef.current);
+      if (channelRef.current) {
+        channelRef.current.close();
       }
     };
   }, []);